@@ -0,0 +1,81 @@
+"""Measure the per-chunk overhead of writing event stream chunks.
+
+Usage: python -m benchmarks.chunks [-n CHUNKS] [-s SIZE]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import socket
+import time
+from asyncio import StreamWriter
+from collections.abc import Callable
+
+from evtstrd.http import write_chunk
+
+
+def _write_chunk_unbuffered(writer: StreamWriter, data: bytes) -> None:
+    """The previous implementation of write_chunk(), for comparison."""
+    writer.write(bytes(hex(len(data))[2:], "ascii"))
+    writer.write(b"\r\n")
+    writer.write(data)
+    writer.write(b"\r\n")
+    encoded = (
+        data.decode("utf-8", errors="ignore")
+        .replace("\r", "\\r")
+        .replace("\n", "\\n")
+    )
+    logging.debug(f"wrote chunk to listener: {encoded}")
+
+
+async def _drain_socket(sock: socket.socket) -> None:
+    loop = asyncio.get_running_loop()
+    while await loop.sock_recv(sock, 65536):
+        pass
+
+
+async def _measure(
+    func: Callable[[StreamWriter, bytes], None], n: int, data: bytes
+) -> float:
+    """Write n chunks to a real socket and return seconds per chunk."""
+    ours, theirs = socket.socketpair()
+    theirs.setblocking(False)
+    drain_task = asyncio.create_task(_drain_socket(theirs))
+    _, writer = await asyncio.open_connection(sock=ours)
+    start = time.perf_counter()
+    for i in range(n):
+        func(writer, data)
+        if i % 100 == 0:
+            await writer.drain()
+    await writer.drain()
+    elapsed = time.perf_counter() - start
+    writer.close()
+    await writer.wait_closed()
+    await drain_task
+    theirs.close()
+    return elapsed / n
+
+
+async def _main(n: int, size: int) -> None:
+    data = b"event: update\r\ndata: " + b"x" * size + b"\r\n\r\n"
+    print(f"{'implementation':>16} {'µs/chunk':>10}")
+    for name, func in [
+        ("four writes", _write_chunk_unbuffered),
+        ("single write", write_chunk),
+    ]:
+        per_chunk = await _measure(func, n, data)
+        print(f"{name:>16} {per_chunk * 1e6:>10.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--chunks", type=int, default=100_000)
+    parser.add_argument("-s", "--size", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(_main(args.chunks, args.size))
+
+
+if __name__ == "__main__":
+    main()
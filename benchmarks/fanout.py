@@ -0,0 +1,94 @@
+"""Measure the cost of notifying many listeners about a single event.
+
+Usage: python -m benchmarks.fanout [-n EVENTS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from asyncio import StreamReader, StreamWriter
+from typing import Any, cast
+
+from evtstrd.config import Config
+from evtstrd.dispatcher import Dispatcher
+from evtstrd.events import JSONEvent
+from evtstrd.http import encode_chunk
+from evtstrd.stats import ServerStats
+
+LISTENER_COUNTS = [1, 10, 100, 1_000, 10_000]
+DATA = {
+    "id": 12345,
+    "name": "Some record",
+    "tags": ["foo", "bar", "baz"],
+    "nested": {"created": "2026-04-13", "count": 42},
+}
+
+
+class _NullReader:
+    def at_eof(self) -> bool:
+        return False
+
+
+class _NullWriter:
+    def write(self, data: bytes) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        return default
+
+
+def _dispatcher(listener_count: int) -> Dispatcher:
+    dispatcher = Dispatcher(Config(), ServerStats())
+    for _ in range(listener_count):
+        dispatcher._setup_listener(
+            cast(StreamReader, _NullReader()),
+            cast(StreamWriter, _NullWriter()),
+            None,
+            {"bench": []},
+        )
+    return dispatcher
+
+
+def _per_listener_serialization(dispatcher: Dispatcher) -> None:
+    """Emulate the previous behavior of serializing once per listener."""
+    for listener in dispatcher.all_listeners:
+        if listener.matches("bench", DATA):
+            event = JSONEvent("update", DATA, "1")
+            listener.writer.write(encode_chunk(bytes(event)))
+
+
+def _measure(n: int, listener_count: int) -> tuple[float, float]:
+    dispatcher = _dispatcher(listener_count)
+    start = time.perf_counter()
+    for i in range(n):
+        dispatcher.notify("bench", "update", DATA, str(i))
+    shared = (time.perf_counter() - start) / n
+    start = time.perf_counter()
+    for _ in range(n):
+        _per_listener_serialization(dispatcher)
+    per_listener = (time.perf_counter() - start) / n
+    return shared, per_listener
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--events", type=int, default=100)
+    args = parser.parse_args()
+    print(
+        f"{'listeners':>10} {'shared µs/event':>16} "
+        f"{'per-listener µs/event':>22} {'speedup':>8}"
+    )
+    for count in LISTENER_COUNTS:
+        shared, per_listener = _measure(args.events, count)
+        print(
+            f"{count:>10} {shared * 1e6:>16.1f} {per_listener * 1e6:>22.1f} "
+            f"{per_listener / shared:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Measure the cost of evaluating event filters.
+
+Usage: python -m benchmarks.filters [-n EVENTS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from jsonget import JsonValue, json_get
+
+from evtstrd.date import parse_iso_date
+from evtstrd.filters import DateFilter, FieldValues, Filter, parse_filter
+
+DATA = {
+    "id": 12345,
+    "name": "Some record",
+    "nested": {"created": "2026-04-13", "count": 42},
+}
+
+# Filter sets to evaluate against DATA. Several filters on the same field
+# benefit from extracting the field value only once per event.
+FILTER_SETS = {
+    "int": ["id=12345"],
+    "nested int": ["nested.count>=10"],
+    "date": ["nested.created>=2026-01-01"],
+    "date range": [
+        "nested.created>=2026-01-01",
+        "nested.created<2027-01-01",
+        "nested.created<=2026-04-13",
+    ],
+    "mixed": ["id=12345", "name='Some record'", "nested.count<100"],
+}
+
+_comparators: dict[str, Callable[[Any, Any], bool]] = {
+    "=": lambda v1, v2: v1 == v2,
+    ">": lambda v1, v2: v1 > v2,
+    ">=": lambda v1, v2: v1 >= v2,
+    "<": lambda v1, v2: v1 < v2,
+    "<=": lambda v1, v2: v1 <= v2,
+}
+
+
+class _PreviousFilter:
+    """The previous implementation of Filter, for comparison.
+
+    It parses the path and checks the field type using json_get() and
+    parses dates on every call.
+    """
+
+    def __init__(self, f: Filter) -> None:
+        self._field = f._field
+        self._comparator = _comparators[f.operator]
+        self._field_type = f.field_type
+        self._is_date = isinstance(f, DateFilter)
+        self.value = f.value
+
+    def __call__(self, message: JsonValue) -> bool:
+        try:
+            v: Any = json_get(message, self._field, self._field_type)
+        except (ValueError, TypeError):
+            return False
+        if self._is_date:
+            try:
+                v = parse_iso_date(v)
+            except ValueError:
+                return False
+        return self._comparator(v, self.value)
+
+
+def _measure_previous(filters: Sequence[_PreviousFilter], n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        for f in filters:
+            f(DATA)
+    return (time.perf_counter() - start) / n
+
+
+def _measure_compiled(filters: Sequence[Filter], n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        values: FieldValues = {}
+        for f in filters:
+            f(DATA, values)
+    return (time.perf_counter() - start) / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--events", type=int, default=100_000)
+    args = parser.parse_args()
+    print(f"{'filters':<12} {'previous µs':>12} {'compiled µs':>12}")
+    for name, strings in FILTER_SETS.items():
+        filters = [parse_filter(s) for s in strings]
+        previous = [_PreviousFilter(f) for f in filters]
+        assert all(f(DATA) for f in previous)
+        assert all(f(DATA) for f in filters)
+        t_previous = _measure_previous(previous, args.events)
+        t_compiled = _measure_compiled(filters, args.events)
+        print(
+            f"{name:<12} {t_previous * 1e6:>12.2f} {t_compiled * 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Measure how many messages per second the publisher socket handles.
+
+Usage: python -m benchmarks.ingest [-n MESSAGES] [-b EVENTS]
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from asyncio import StreamReader, StreamWriter
+from collections.abc import Callable, Sequence
+from typing import Any, cast
+
+import evtstrd.util
+from evtstrd.events import Notification
+from evtstrd.exc import DisconnectedError
+from evtstrd.socket_server import SocketHandler
+
+
+class _CountingDispatcher:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def notify_all(self, notifications: Sequence[Notification]) -> int:
+        self.count += len(notifications)
+        return 0
+
+
+async def _read_json_line(reader: StreamReader) -> Any:
+    """The previous implementation of reading messages, for comparison."""
+    while True:
+        line = await reader.readline()
+        if line:
+            logging.debug(f"read line from socket: {line!r}")
+            try:
+                return json.loads(line.decode("utf-8").strip())
+            except (ValueError, UnicodeDecodeError):
+                logging.warning("invalid JSON received")
+        if reader.at_eof():
+            raise DisconnectedError()
+
+
+async def _handle_by_line(
+    handler: SocketHandler, reader: StreamReader
+) -> None:
+    while True:
+        try:
+            message = await _read_json_line(reader)
+        except DisconnectedError:
+            break
+        handler.handle_message(message)
+
+
+def _messages(n: int, batch_size: int) -> bytes:
+    lines = []
+    for i in range(n):
+        events = [
+            {
+                "subsystem": "bench",
+                "event": "update",
+                "data": {"id": i, "name": "Some record", "count": j},
+                "id": f"{i}-{j}",
+            }
+            for j in range(batch_size)
+        ]
+        message: dict[str, Any]
+        if batch_size == 1:
+            message = {"action": "notify", **events[0]}
+        else:
+            message = {"action": "notify-batch", "events": events}
+        lines.append(json.dumps(message).encode() + b"\n")
+    return b"".join(lines)
+
+
+async def _measure(by_line: bool, data: bytes) -> tuple[float, int]:
+    """Handle all messages and return the seconds taken and events seen."""
+    dispatcher = _CountingDispatcher()
+    handler = SocketHandler(dispatcher)
+    # Like the asyncio server, feed the data in 64 KiB pieces.
+    reader = StreamReader()
+    for i in range(0, len(data), 65536):
+        reader.feed_data(data[i : i + 65536])
+    reader.feed_eof()
+    start = time.perf_counter()
+    if by_line:
+        await _handle_by_line(handler, reader)
+    else:
+        await handler.handle(reader, cast(StreamWriter, None))
+    return time.perf_counter() - start, dispatcher.count
+
+
+async def _main(n: int, batch_size: int) -> None:
+    data = _messages(n, batch_size)
+    backend_loads = evtstrd.util.json_loads
+    runs: list[tuple[str, bool, Callable[[bytes], Any]]] = [
+        ("by line, json", True, json.loads)
+    ]
+    runs.append(("buffered, json", False, json.loads))
+    if evtstrd.util.json_backend != "json":
+        name = f"buffered, {evtstrd.util.json_backend}"
+        runs.append((name, False, backend_loads))
+    print(f"{'reader':<20} {'messages/s':>12} {'events/s':>12}")
+    for name, by_line, loads in runs:
+        evtstrd.util.json_loads = loads
+        seconds, events = await _measure(by_line, data)
+        print(f"{name:<20} {n / seconds:>12,.0f} {events / seconds:>12,.0f}")
+    evtstrd.util.json_loads = backend_loads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--messages", type=int, default=100_000)
+    parser.add_argument(
+        "-b",
+        "--batch-size",
+        type=int,
+        default=1,
+        help="events per message, uses notify-batch if greater than 1",
+    )
+    args = parser.parse_args()
+    asyncio.run(_main(args.messages, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
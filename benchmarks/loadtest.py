@@ -0,0 +1,343 @@
+"""Load test a local eventstreamd server.
+
+Starts a server, opens many concurrent event stream clients, publishes
+events through the Unix socket at a target rate, and reports throughput,
+publish-to-receive latency, and server resource usage.
+
+Usage: python -m benchmarks.loadtest [options]
+
+Example:
+
+    python -m benchmarks.loadtest -c 1000 -r 200 -d 10 \\
+        --filter "" --filter "value=1" --filter "value<=5"
+
+Clients and publishers run in a single process, so for large client
+counts the load generator itself can become the bottleneck. Compare the
+server CPU usage reported at the end with the load generator's.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from asyncio import StreamReader
+from dataclasses import dataclass, field
+from pathlib import Path
+from urllib.parse import urlencode
+
+SUBSYSTEM = "loadtest"
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+@dataclass
+class _Results:
+    connected: int = 0
+    received: int = 0
+    published: int = 0
+    latencies: list[float] = field(default_factory=list)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+def _process_tree(pid: int) -> list[int]:
+    """Return the pid and the pids of all its direct children."""
+    pids = [pid]
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The process name can contain spaces, so split after it.
+        fields = stat.rsplit(")", 1)[1].split()
+        if int(fields[1]) == pid:
+            pids.append(int(entry.name))
+    return pids
+
+
+def _resource_usage(pid: int) -> tuple[float, int]:
+    """Return the CPU seconds and RSS bytes of a process and its children."""
+    cpu = 0.0
+    rss = 0
+    for p in _process_tree(pid):
+        try:
+            stat = Path(f"/proc/{p}/stat").read_text()
+        except OSError:
+            continue
+        fields = stat.rsplit(")", 1)[1].split()
+        cpu += (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS
+        rss += int(fields[21]) * _PAGE_SIZE
+    return cpu, rss
+
+
+def _start_server(
+    directory: str, port: int, workers: int, queue_size: int
+) -> tuple[subprocess.Popen[bytes], str]:
+    socket_file = os.path.join(directory, "eventstreamd.sock")
+    config_file = os.path.join(directory, "eventstreamd.conf")
+    with open(config_file, "w") as f:
+        f.write(
+            "[General]\n"
+            f"SocketFile = {socket_file}\n"
+            f"HTTPPort = {port}\n"
+            f"Workers = {workers}\n"
+            f"QueueSize = {queue_size}\n"
+        )
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "from evtstrd.main import main; main()",
+            "-c",
+            config_file,
+        ],
+        stderr=subprocess.DEVNULL,
+    )
+    return server, socket_file
+
+
+async def _wait_for_server(port: int, socket_file: str) -> None:
+    for _ in range(100):
+        if os.path.exists(socket_file):
+            try:
+                _, writer = await asyncio.open_connection("127.0.0.1", port)
+            except OSError:
+                pass
+            else:
+                writer.close()
+                return
+        await asyncio.sleep(0.05)
+    raise RuntimeError("server did not start")
+
+
+async def _read_chunk(reader: StreamReader) -> bytes:
+    size = int((await reader.readline()).strip(), 16)
+    data = await reader.readexactly(size + 2)
+    return data[:-2]
+
+
+async def _client(
+    port: int, filter_: str, results: _Results, ready: asyncio.Event
+) -> None:
+    query = {"subsystem": SUBSYSTEM}
+    if filter_:
+        query["filter"] = filter_
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(
+        f"GET /events?{urlencode(query)} HTTP/1.1\r\n"
+        f"Host: localhost\r\n\r\n".encode("ascii")
+    )
+    await reader.readuntil(b"\r\n\r\n")
+    results.connected += 1
+    await ready.wait()
+    buffer = b""
+    try:
+        while True:
+            chunk = await _read_chunk(reader)
+            if not chunk:
+                break
+            buffer += chunk
+            *events, buffer = buffer.split(b"\r\n\r\n")
+            now = time.time()
+            for event in events:
+                for line in event.split(b"\r\n"):
+                    if line.startswith(b"data: {"):
+                        sent = json.loads(line[6:])["sent"]
+                        results.latencies.append(now - sent)
+                        results.received += 1
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _publisher(
+    socket_file: str,
+    rate: float,
+    values: int,
+    batch: bool,
+    results: _Results,
+    stop: asyncio.Event,
+) -> None:
+    _, writer = await asyncio.open_unix_connection(socket_file)
+    tick = 0.01
+    start = time.monotonic()
+    sent = 0
+    while not stop.is_set():
+        due = int((time.monotonic() - start) * rate) - sent
+        events: list[dict[str, object]] = [
+            {
+                "subsystem": SUBSYSTEM,
+                "event": "update",
+                "data": {
+                    "sent": time.time(),
+                    "value": random.randrange(values),
+                },
+                "id": str(sent + i),
+            }
+            for i in range(due)
+        ]
+        if batch and events:
+            message: dict[str, object] = {
+                "action": "notify-batch",
+                "events": events,
+            }
+            writer.write(json.dumps(message).encode() + b"\n")
+        else:
+            for event in events:
+                message = {"action": "notify", **event}
+                writer.write(json.dumps(message).encode() + b"\n")
+        sent += due
+        results.published += due
+        await writer.drain()
+        await asyncio.sleep(tick)
+    writer.close()
+
+
+def _percentile(values: list[float], p: int) -> float:
+    if not values:
+        return float("nan")
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method="inclusive")[p - 1]
+
+
+async def _run(args: argparse.Namespace) -> None:
+    filters = args.filter or [""]
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as directory:
+        server, socket_file = _start_server(
+            directory, port, args.workers, args.queue_size
+        )
+        try:
+            await _wait_for_server(port, socket_file)
+            await _load(args, filters, port, socket_file, server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+
+
+async def _load(
+    args: argparse.Namespace,
+    filters: list[str],
+    port: int,
+    socket_file: str,
+    pid: int,
+) -> None:
+    results = _Results()
+    ready = asyncio.Event()
+    clients = [
+        asyncio.create_task(
+            _client(port, filters[i % len(filters)], results, ready)
+        )
+        for i in range(args.clients)
+    ]
+    while results.connected < args.clients:
+        await asyncio.sleep(0.05)
+    _, idle_rss = _resource_usage(pid)
+    ready.set()
+
+    stop = asyncio.Event()
+    publishers = [
+        asyncio.create_task(
+            _publisher(
+                socket_file,
+                args.rate / args.publishers,
+                args.values,
+                args.batch,
+                results,
+                stop,
+            )
+        )
+        for _ in range(args.publishers)
+    ]
+    cpu_start, _ = _resource_usage(pid)
+    start = time.monotonic()
+    await asyncio.sleep(args.duration)
+    stop.set()
+    await asyncio.gather(*publishers)
+    # Give the server some time to deliver the remaining events.
+    await asyncio.sleep(1)
+    elapsed = time.monotonic() - start
+    cpu_end, rss = _resource_usage(pid)
+    for client in clients:
+        client.cancel()
+
+    latencies = [lat * 1000 for lat in results.latencies]
+    print(f"clients:              {args.clients}")
+    print(f"filters:              {', '.join(repr(f) for f in filters)}")
+    print(f"published events:     {results.published}")
+    print(f"received events:      {results.received}")
+    print(f"delivery throughput:  {results.received / elapsed:.0f} events/s")
+    print(f"latency p50:          {_percentile(latencies, 50):.1f} ms")
+    print(f"latency p99:          {_percentile(latencies, 99):.1f} ms")
+    print(f"server RSS (idle):    {idle_rss / 2**20:.1f} MiB")
+    print(f"server RSS (end):     {rss / 2**20:.1f} MiB")
+    cpu = (cpu_end - cpu_start) / elapsed * 100
+    print(f"server CPU:           {cpu:.0f} %")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0] if __doc__ else None
+    )
+    parser.add_argument(
+        "-c", "--clients", type=int, default=100, help="number of clients"
+    )
+    parser.add_argument(
+        "-p", "--publishers", type=int, default=1, help="number of publishers"
+    )
+    parser.add_argument(
+        "-r",
+        "--rate",
+        type=float,
+        default=100,
+        help="total events published per second",
+    )
+    parser.add_argument(
+        "-d", "--duration", type=float, default=10, help="seconds to publish"
+    )
+    parser.add_argument(
+        "-f",
+        "--filter",
+        action="append",
+        help="client filter, can be given several times to mix filters; "
+        "clients are assigned the filters in turn",
+    )
+    parser.add_argument(
+        "--values",
+        type=int,
+        default=10,
+        help="events have a 'value' field between 0 and VALUES - 1",
+    )
+    parser.add_argument(
+        "--batch", action="store_true", help="publish using notify-batch"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="server worker processes"
+    )
+    parser.add_argument(
+        "--queue-size", type=int, default=1000, help="server queue size"
+    )
+    args = parser.parse_args()
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,122 @@
+from __future__ import annotations
+
+import asyncio
 import datetime
-from collections.abc import Mapping
+import time
+from collections.abc import Awaitable, Callable, Mapping, Sequence
 from http import HTTPStatus
-from typing import Any
+from typing import Any, TypeAlias
 
+from evtstrd.date import naive_utc, utcnow
 from evtstrd.exc import PluginError
 from evtstrd.http import HTTPError
 from evtstrd.plugins import load_plugin
 
+AuthPlugin: TypeAlias = Callable[..., Awaitable[Mapping[str, Any]]]
+
+_CacheKey: TypeAlias = tuple[Any, ...]
+
+
+def load_auth_plugin() -> AuthPlugin | None:
+    plugin: AuthPlugin | None = load_plugin("auth", "check_auth")
+    return plugin
+
+
+class Authorizer:
+    """Check authorization using the auth plugin.
+
+    If cache_ttl is greater than 0, "ok" decisions of the plugin are cached
+    for that many seconds, but not beyond their expiry time. At most
+    cache_size decisions are kept, the least recently used are discarded
+    first. Decisions are cached per route, extra arguments, and values of
+    the cache_headers, which must be given in lower-case. Concurrent checks
+    with the same key share a single plugin call.
+    """
+
+    def __init__(
+        self,
+        plugin: AuthPlugin | None,
+        *,
+        cache_ttl: float = 0,
+        cache_size: int = 0,
+        cache_headers: Sequence[str] = (),
+    ) -> None:
+        self._plugin = plugin
+        self._cache_ttl = cache_ttl
+        self._cache_size = cache_size
+        self._cache_headers = list(cache_headers)
+        # Maps keys to responses and the monotonic time until which they
+        # are valid. Ordered by last use, oldest first.
+        self._cache: dict[_CacheKey, tuple[Mapping[str, Any], float]] = {}
+        self._in_flight: dict[_CacheKey, asyncio.Task[Mapping[str, Any]]] = {}
+
+    async def check(
+        self, route: str, headers: Mapping[str, str], **kwargs: Any
+    ) -> tuple[datetime.datetime | None, Any]:
+        """Check whether a request is authorized.
+
+        Return the expiry time of the authorization and the plugin's data.
+        Raise an HTTPError if the request is not authorized.
+        """
+        if self._plugin is None:
+            return None, None
+        if self._cache_ttl > 0 and self._cache_size > 0:
+            response = await self._cached_response(route, headers, kwargs)
+        else:
+            response = await self._plugin(route, headers, **kwargs)
+        return _evaluate_response(response)
+
+    async def _cached_response(
+        self, route: str, headers: Mapping[str, str], kwargs: dict[str, Any]
+    ) -> Mapping[str, Any]:
+        key = (
+            route,
+            tuple(sorted(kwargs.items())),
+            tuple(headers.get(h) for h in self._cache_headers),
+        )
+        cached = self._cache.pop(key, None)
+        if cached is not None and cached[1] > time.monotonic():
+            # Re-insert the response to keep the dict ordered by last use.
+            self._cache[key] = cached
+            return cached[0]
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(
+                self._call_plugin(key, route, headers, kwargs)
+            )
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # Do not cancel the plugin call for other waiting requests.
+        return await asyncio.shield(task)
+
+    async def _call_plugin(
+        self,
+        key: _CacheKey,
+        route: str,
+        headers: Mapping[str, str],
+        kwargs: dict[str, Any],
+    ) -> Mapping[str, Any]:
+        assert self._plugin is not None
+        response = await self._plugin(route, headers, **kwargs)
+        if response.get("status") == "ok":
+            self._store(key, response)
+        return response
+
+    def _store(self, key: _CacheKey, response: Mapping[str, Any]) -> None:
+        ttl = self._cache_ttl
+        expire: datetime.datetime | None = response.get("expire")
+        if expire is not None:
+            ttl = min(ttl, (naive_utc(expire) - utcnow()).total_seconds())
+            if ttl <= 0:
+                return
+        self._cache[key] = (response, time.monotonic() + ttl)
+        while len(self._cache) > self._cache_size:
+            del self._cache[next(iter(self._cache))]
+
 
-async def check_auth(
-    path: str, headers: Mapping[str, str], **kwargs: Any
+def _evaluate_response(
+    response: Mapping[str, Any],
 ) -> tuple[datetime.datetime | None, Any]:
-    auth = load_plugin("auth", "check_auth")
-    if auth is None:
-        return None, None
-    response = await auth(path, headers, **kwargs)
     status = response["status"]
     if status == "ok":
         expire: datetime.datetime | None = response.get("expire")
@@ -12,6 +12,9 @@ def parse_command_line() -> Config:
     parser.add_argument("--ssl-key", help="SSL key file")
     parser.add_argument("--ssl-cert", help="SSL certificate file")
     parser.add_argument("-p", "--port", help="HTTP port", type=int)
+    parser.add_argument(
+        "-w", "--workers", help="number of HTTP worker processes", type=int
+    )
     parser.add_argument(
         "-d", "--debug", help="enable debug mode", action="store_true"
     )
@@ -29,4 +32,8 @@ def parse_command_line() -> Config:
         config.cert_file = args.ssl_cert
     if args.port is not None:
         config.http_port = args.port
+    if args.workers is not None:
+        if args.workers < 1:
+            parser.error("number of workers must be at least 1")
+        config.workers = args.workers
     return config
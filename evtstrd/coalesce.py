@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable, Hashable, Mapping
+
+from evtstrd.events import Notification
+from evtstrd.metrics import LabeledCounter
+
+_Key = tuple[str, str, Hashable]
+
+
+class CoalesceRule:
+    """Collapse the events of a subsystem that share a key.
+
+    Events share a key if they have the same type and the same value at
+    key_path in their data. key_path uses dots to separate the names of
+    nested fields. Events that share a key within window seconds are
+    collapsed to the latest one.
+    """
+
+    def __init__(self, key_path: str, window: float) -> None:
+        if not key_path:
+            raise ValueError("missing key path")
+        if window <= 0:
+            raise ValueError("coalesce window must be greater than 0")
+        self.key_path = key_path
+        self._path = tuple(key_path.split("."))
+        self.window = window
+
+    def key_value(self, notification: Notification) -> Hashable | None:
+        """Return the value of an event's key field.
+
+        Return None if the event can't be coalesced, because the key field
+        is missing or is not a scalar.
+        """
+        value = notification.data
+        for name in self._path:
+            if not isinstance(value, dict) or name not in value:
+                return None
+            value = value[name]
+        if value is None or isinstance(value, (dict, list)):
+            return None
+        return value
+
+
+class Coalescer:
+    """Hold back events that can be coalesced with later events.
+
+    The first event with a coalesce key is held back for the window of its
+    subsystem's rule. Later events with the same key replace the held
+    event. When the window ends, the latest event is passed to dispatch.
+    Replaced events are counted in saved, per subsystem.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[str, CoalesceRule],
+        dispatch: Callable[[Notification], object],
+        saved: LabeledCounter,
+    ) -> None:
+        self._rules = rules
+        self._dispatch = dispatch
+        self._saved = saved
+        self._pending: dict[_Key, Notification] = {}
+
+    def hold(self, notification: Notification) -> bool:
+        """Hold back an event if it can be coalesced.
+
+        Return False if the event must be dispatched immediately.
+        """
+        rule = self._rules.get(notification.subsystem)
+        if rule is None:
+            return False
+        value = rule.key_value(notification)
+        if value is None:
+            return False
+        key = (notification.subsystem, notification.type, value)
+        if key in self._pending:
+            self._saved.inc(notification.subsystem)
+        else:
+            asyncio.get_running_loop().call_later(
+                rule.window, self._flush, key
+            )
+        self._pending[key] = notification
+        return True
+
+    def _flush(self, key: _Key) -> None:
+        notification = self._pending.pop(key, None)
+        if notification is not None:
+            self._dispatch(notification)
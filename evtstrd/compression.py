@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+import zlib
+from collections.abc import Iterable
+
+# Supported content codings and the matching zlib window bits, in order of
+# preference.
+_WINDOW_BITS = {"gzip": 16 + zlib.MAX_WBITS, "deflate": zlib.MAX_WBITS}
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """Select a supported content coding from an Accept-Encoding header.
+
+    Return None if the client does not accept any supported coding.
+    """
+    if not accept_encoding:
+        return None
+    qualities: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = [s.strip() for s in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    best: str | None = None
+    best_quality = 0.0
+    for coding in _WINDOW_BITS:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class StreamCompressor:
+    """Compress the event stream of a single connection.
+
+    The compressed data is flushed after each call to compress(), so that
+    clients can decompress all events written so far. The level and memory
+    level are passed to zlib. Higher memory levels compress better and
+    faster, but use more memory per connection.
+    """
+
+    def __init__(self, encoding: str, level: int, mem_level: int) -> None:
+        self.encoding = encoding
+        self._compressor = zlib.compressobj(
+            level, zlib.DEFLATED, _WINDOW_BITS[encoding], mem_level
+        )
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # Time spent compressing, in seconds.
+        self.duration = 0.0
+
+    def compress(self, data: Iterable[bytes]) -> bytes:
+        start = time.perf_counter()
+        compressed = []
+        for d in data:
+            self.bytes_in += len(d)
+            compressed.append(self._compressor.compress(d))
+        compressed.append(self._compressor.flush(zlib.Z_SYNC_FLUSH))
+        result = b"".join(compressed)
+        self.bytes_out += len(result)
+        self.duration += time.perf_counter() - start
+        return result
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+        result = self._compressor.flush(zlib.Z_FINISH)
+        self.bytes_out += len(result)
+        return result
@@ -1,14 +1,37 @@
 import configparser
 from configparser import NoOptionError
 
+from evtstrd.coalesce import CoalesceRule
+from evtstrd.http import HEAD_TIMEOUT, MAX_HEAD_SIZE, MAX_HEADERS
+from evtstrd.routing import is_pattern
+
 DEFAULT_CONFIG = "/etc/eventstreamd.conf"
 
 SOCKET_NAME = "/var/run/eventstreamd.sock"
 SOCKET_MODE = 0o0600
 
 HTTP_PORT = 8888
+WORKERS = 1
 
 PING_INTERVAL = 20
+HEARTBEAT_STYLES = ["event", "comment"]
+HEARTBEAT_STYLE = "event"
+
+QUEUE_SIZE = 1000
+SLOW_CONSUMER_POLICIES = ["drop-oldest", "drop-newest", "disconnect"]
+SLOW_CONSUMER_POLICY = "drop-oldest"
+
+REPLAY_DEPTH = 100
+REPLAY_MAX_AGE = 300  # in seconds
+
+COMPRESSION_LEVEL = 6
+COMPRESSION_MEM_LEVEL = 8
+
+AUTH_CACHE_TTL = 0  # in seconds, 0 disables the cache
+AUTH_CACHE_SIZE = 10000
+AUTH_CACHE_HEADERS = ["authorization", "cookie"]
+
+COALESCE_WINDOW = 1.0  # in seconds
 
 
 class Config:
@@ -20,7 +43,24 @@ class Config:
         self.cert_file: str | None = None
         self.key_file: str | None = None
         self.http_port = HTTP_PORT
+        self.workers = WORKERS
         self.ping_interval = PING_INTERVAL
+        self.heartbeat_style = HEARTBEAT_STYLE
+        self.queue_size = QUEUE_SIZE
+        self.slow_consumer_policy = SLOW_CONSUMER_POLICY
+        self.replay_depth = REPLAY_DEPTH
+        self.replay_max_age: float = REPLAY_MAX_AGE
+        self.head_timeout: float = HEAD_TIMEOUT
+        self.max_head_size = MAX_HEAD_SIZE
+        self.max_headers = MAX_HEADERS
+        self.compression = False
+        self.compression_level = COMPRESSION_LEVEL
+        self.compression_mem_level = COMPRESSION_MEM_LEVEL
+        self.auth_cache_ttl: float = AUTH_CACHE_TTL
+        self.auth_cache_size = AUTH_CACHE_SIZE
+        self.auth_cache_headers = list(AUTH_CACHE_HEADERS)
+        # Maps subsystems to their coalesce rules.
+        self.coalesce: dict[str, CoalesceRule] = {}
         self.debug = False
 
     @property
@@ -51,6 +91,82 @@ def read_config(filename: str) -> Config:
         config.http_port = parser.getint(
             "General", "HTTPPort", fallback=HTTP_PORT
         )
+        config.workers = parser.getint("General", "Workers", fallback=WORKERS)
+        if config.workers < 1:
+            raise ValueError("number of workers must be at least 1")
+        config.heartbeat_style = parser.get(
+            "General", "HeartbeatStyle", fallback=HEARTBEAT_STYLE
+        )
+        if config.heartbeat_style not in HEARTBEAT_STYLES:
+            raise ValueError(
+                f"invalid heartbeat style '{config.heartbeat_style}'"
+            )
+        config.queue_size = parser.getint(
+            "General", "QueueSize", fallback=QUEUE_SIZE
+        )
+        config.slow_consumer_policy = parser.get(
+            "General", "SlowConsumerPolicy", fallback=SLOW_CONSUMER_POLICY
+        )
+        if config.slow_consumer_policy not in SLOW_CONSUMER_POLICIES:
+            raise ValueError(
+                f"invalid slow consumer policy '{config.slow_consumer_policy}'"
+            )
+        config.replay_depth = parser.getint(
+            "General", "ReplayDepth", fallback=REPLAY_DEPTH
+        )
+        config.replay_max_age = parser.getfloat(
+            "General", "ReplayMaxAge", fallback=REPLAY_MAX_AGE
+        )
+        config.head_timeout = parser.getfloat(
+            "General", "HeadTimeout", fallback=HEAD_TIMEOUT
+        )
+        config.max_head_size = parser.getint(
+            "General", "MaxHeadSize", fallback=MAX_HEAD_SIZE
+        )
+        config.max_headers = parser.getint(
+            "General", "MaxHeaders", fallback=MAX_HEADERS
+        )
+        config.compression = parser.getboolean(
+            "General", "Compression", fallback=False
+        )
+        config.compression_level = parser.getint(
+            "General", "CompressionLevel", fallback=COMPRESSION_LEVEL
+        )
+        if not 0 <= config.compression_level <= 9:
+            raise ValueError("compression level must be between 0 and 9")
+        config.compression_mem_level = parser.getint(
+            "General", "CompressionMemLevel", fallback=COMPRESSION_MEM_LEVEL
+        )
+        if not 1 <= config.compression_mem_level <= 9:
+            raise ValueError(
+                "compression memory level must be between 1 and 9"
+            )
+        config.auth_cache_ttl = parser.getfloat(
+            "General", "AuthCacheTTL", fallback=AUTH_CACHE_TTL
+        )
+        config.auth_cache_size = parser.getint(
+            "General", "AuthCacheSize", fallback=AUTH_CACHE_SIZE
+        )
+        try:
+            cache_headers = parser.get("General", "AuthCacheHeaders")
+        except NoOptionError:
+            pass
+        else:
+            config.auth_cache_headers = [
+                h.strip().lower()
+                for h in cache_headers.split(",")
+                if h.strip()
+            ]
+        for section in parser.sections():
+            kind, _, subsystem = section.partition(" ")
+            if kind != "Coalesce":
+                continue
+            if not subsystem or is_pattern(subsystem):
+                raise ValueError(f"invalid coalesce subsystem '{subsystem}'")
+            config.coalesce[subsystem] = CoalesceRule(
+                parser.get(section, "KeyPath"),
+                parser.getfloat(section, "Window", fallback=COALESCE_WINDOW),
+            )
     return config
 
 
@@ -14,3 +14,18 @@ def parse_iso_date(date_string: str) -> datetime.date:
         return datetime.date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
     except ValueError as exc:
         raise ValueError(f"invalid date '{date_string}'") from exc
+
+
+def utcnow() -> datetime.datetime:
+    """Return the current time as naive datetime in UTC."""
+    return datetime.datetime.now(datetime.UTC).replace(tzinfo=None)
+
+
+def naive_utc(dt: datetime.datetime) -> datetime.datetime:
+    """Convert a datetime to a naive datetime in UTC.
+
+    Naive datetimes are assumed to be in UTC already.
+    """
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(datetime.UTC).replace(tzinfo=None)
@@ -1,15 +1,23 @@
-import asyncio
 import datetime
+import heapq
 import logging
-from asyncio import FIRST_COMPLETED, StreamReader, StreamWriter
-from collections import defaultdict
-from collections.abc import Iterable
+import time
+from asyncio import StreamReader, StreamWriter
+from collections.abc import Iterable, Mapping, Sequence
 
 from jsonget import JsonValue
 
+from evtstrd.coalesce import Coalescer
+from evtstrd.compression import StreamCompressor
 from evtstrd.config import Config
+from evtstrd.events import Comment, Notification, PingEvent
+from evtstrd.expiry import ExpiryScheduler
 from evtstrd.filters import Filter
+from evtstrd.heartbeat import HeartbeatScheduler
+from evtstrd.index import FilterIndex
 from evtstrd.listener import Listener
+from evtstrd.replay import ReplayBuffer
+from evtstrd.routing import Router
 from evtstrd.stats import ServerStats
 
 
@@ -17,28 +25,65 @@ class Dispatcher:
     def __init__(self, config: Config, stats: ServerStats) -> None:
         self._config = config
         self._stats = stats
-        self._listeners: dict[str, list[Listener]] = defaultdict(list)
+        # Maps subscribed subsystems and subsystem patterns to their
+        # listeners. Subsystems without listeners are removed.
+        self._listeners: Router[FilterIndex] = Router()
+        # All listeners, in the order they connected.
+        self._all_listeners: dict[Listener, None] = {}
+        self._all_listeners_snapshot: tuple[Listener, ...] | None = None
+        # Ordered by the time of the last notification, oldest first.
+        self._replay_buffers: dict[str, ReplayBuffer] = {}
+        heartbeat = (
+            Comment() if config.heartbeat_style == "comment" else PingEvent()
+        )
+        self._heartbeats = HeartbeatScheduler(config.ping_interval, heartbeat)
+        self._expiry = ExpiryScheduler(Listener.logout)
+        self._coalescer = Coalescer(
+            config.coalesce,
+            lambda n: self._notify_all([n]),
+            stats.coalesced_events,
+        )
 
     @property
-    def all_listeners(self) -> list[Listener]:
-        all_listeners = []
-        for key in self._listeners:
-            all_listeners.extend(self._listeners[key])
-        return all_listeners
+    def all_listeners(self) -> Sequence[Listener]:
+        """All listeners, in the order they connected.
+
+        This is a snapshot that is not affected by listeners connecting or
+        disconnecting later. It is only rebuilt after that happened.
+        """
+        if self._all_listeners_snapshot is None:
+            self._all_listeners_snapshot = tuple(self._all_listeners)
+        return self._all_listeners_snapshot
 
     async def handle_listener(
         self,
         reader: StreamReader,
         writer: StreamWriter,
         referer: str | None,
-        subsystem: str,
-        filters: Iterable[Filter],
+        subscriptions: Mapping[str, Iterable[Filter]],
         *,
         expire: datetime.datetime | None = None,
+        last_event_id: str | None = None,
+        encoding: str | None = None,
+        max_rate: float | None = None,
     ) -> None:
-        listener = self._setup_listener(
-            reader, writer, referer, subsystem, filters
-        )
+        """Deliver events to a client until it disconnects.
+
+        subscriptions maps the subsystems the client subscribed to to the
+        filters for that subsystem. If max_rate is given, at most that many
+        events per second are written to the client.
+        """
+        listener = self._setup_listener(reader, writer, referer, subscriptions)
+        if encoding is not None:
+            listener.compressor = StreamCompressor(
+                encoding,
+                self._config.compression_level,
+                self._config.compression_mem_level,
+            )
+        if max_rate is not None:
+            listener.limit_rate(max_rate)
+        if last_event_id is not None:
+            self._replay(listener, last_event_id)
         await self._run_listener(listener, expire)
 
     def _setup_listener(
@@ -46,58 +91,190 @@ class Dispatcher:
         reader: StreamReader,
         writer: StreamWriter,
         referer: str | None,
-        subsystem: str,
-        filters: Iterable[Filter],
+        subscriptions: Mapping[str, Iterable[Filter]],
     ) -> Listener:
-        listener = Listener(self._config, reader, writer, subsystem, filters)
+        listener = Listener(self._config, reader, writer, subscriptions)
         listener.referer = referer
         listener.on_close = self._remove_listener
-        self._listeners[subsystem].append(listener)
+        for subsystem, filters in listener.subscriptions.items():
+            index = self._listeners.get(subsystem)
+            if index is None:
+                index = FilterIndex()
+                self._listeners.set(subsystem, index)
+            index.add(listener, filters)
+        self._all_listeners[listener] = None
+        self._all_listeners_snapshot = None
         self._stats.total_connections += 1
+        self._stats.connections.add(listener)
         self._log_listener_added(listener)
         return listener
 
-    def _log_listener_added(self, listener: Listener) -> None:
-        msg = (
-            f"client {listener} subscribed to subsystem '{listener.subsystem}'"
+    def _replay(self, listener: Listener, last_event_id: str) -> None:
+        """Send the events after last_event_id to a new listener.
+
+        The events of all subscribed subsystems are merged in the order
+        they were received.
+        """
+        buffers = {
+            s: b
+            for s, b in self._replay_buffers.items()
+            if listener.subscribes_to(s)
+        }
+        orders = [b.order_of(last_event_id) for b in buffers.values()]
+        known_orders = [o for o in orders if o is not None]
+        if not known_orders:
+            logging.info(
+                f"client {listener} requested replay after unknown event "
+                f"'{last_event_id}'"
+            )
+            return
+        # If the id was used in several subsystems, resume after the most
+        # recent event.
+        last_order = max(known_orders)
+        entries = heapq.merge(
+            *[
+                [(o, s, n) for o, n in b.entries_after(last_order)]
+                for s, b in buffers.items()
+            ]
         )
-        if listener.filters:
-            filter_str = ", ".join(str(f) for f in listener.filters)
-            msg += f" with filters {filter_str}"
-        logging.info(msg)
+        matching = [n for _, s, n in entries if listener.matches(s, n.data)]
+        # Do not overflow the listener's queue before it has even started.
+        matching = matching[-self._config.queue_size :]
+        for n in matching:
+            listener.send(n.event)
+        logging.info(f"replayed {len(matching)} events to client {listener}")
+
+    def _log_listener_added(self, listener: Listener) -> None:
+        subscriptions = []
+        for subsystem, filters in listener.subscriptions.items():
+            msg = f"'{subsystem}'"
+            if filters:
+                filter_str = ", ".join(str(f) for f in filters)
+                msg += f" with filters {filter_str}"
+            subscriptions.append(msg)
+        if len(subscriptions) == 1:
+            msg = f"subsystem {subscriptions[0]}"
+        else:
+            msg = f"subsystems {'; '.join(subscriptions)}"
+        logging.info(f"client {listener} subscribed to {msg}")
 
     def _remove_listener(self, listener: Listener) -> None:
-        self._listeners[listener.subsystem].remove(listener)
-        logging.info(
-            f"client {listener} disconnected from subsystem "
-            f"'{listener.subsystem}'"
-        )
+        for subsystem in listener.subscriptions:
+            index = self._listeners.get(subsystem)
+            if index is not None:
+                index.remove(listener)
+                if not len(index):
+                    self._listeners.remove(subsystem)
+        self._all_listeners.pop(listener, None)
+        self._all_listeners_snapshot = None
+        self._stats.connections.remove(listener)
+        subsystems = ", ".join(f"'{s}'" for s in listener.subscriptions)
+        logging.info(f"client {listener} disconnected from {subsystems}")
 
     async def _run_listener(
         self, listener: Listener, expire: datetime.datetime | None
     ) -> None:
-        futures = [asyncio.ensure_future(listener.ping_loop())]
         if expire:
-            futures.append(asyncio.ensure_future(listener.logout_at(expire)))
-        await asyncio.wait(futures, return_when=FIRST_COMPLETED)
-        for f in futures:
-            f.cancel()
-
+            self._expiry.add(listener, expire)
+        self._heartbeats.add(listener)
+        try:
+            await listener.write_loop()
+        finally:
+            self._expiry.remove(listener)
+            self._heartbeats.remove(listener)
+            listener.close()
         listener.disconnect()
+        self._stats.add_listener_totals(listener)
 
     def notify(
         self, subsystem: str, event_type: str, data: JsonValue, id: str
     ) -> None:
-        # Copy the list of listeners, because it can be modified during the
-        # iteration.
-        listeners = self._listeners[subsystem][:]
-        for listener in listeners:
-            listener.notify(event_type, data, id)
-        logging.info(
-            f"notified {len(listeners)} listeners about '{event_type}' event "
-            f"in subsystem '{subsystem}'"
+        self.notify_all([Notification(subsystem, event_type, data, id)])
+
+    def notify_all(self, notifications: Sequence[Notification]) -> int:
+        """Notify listeners about several events in one pass.
+
+        Events of subsystems with a coalesce rule may be held back and
+        sent later. Return the total number of times a listener was
+        notified.
+        """
+        return self._notify_all(
+            [n for n in notifications if not self._coalescer.hold(n)]
+        )
+
+    def _notify_all(self, notifications: Sequence[Notification]) -> int:
+        notified = 0
+        for notification in notifications:
+            notified += self._dispatch(notification)
+        if len(notifications) == 1:
+            n = notifications[0]
+            total = sum(len(i) for i in self._listeners.match(n.subsystem))
+            logging.info(
+                f"notified {notified} of {total} listeners about "
+                f"'{n.type}' event in subsystem '{n.subsystem}'"
+            )
+        elif notifications:
+            subsystems = ", ".join(
+                f"'{s}'"
+                for s in dict.fromkeys(n.subsystem for n in notifications)
+            )
+            logging.info(
+                f"notified listeners {notified} times about "
+                f"{len(notifications)} events in subsystems {subsystems}"
+            )
+        return notified
+
+    def _dispatch(self, notification: Notification) -> int:
+        start = time.perf_counter()
+        indexes = self._listeners.match(notification.subsystem)
+        # Avoid parsing the data of notifications with serialized data if
+        # no filter needs it.
+        data = (
+            notification.data if any(i.has_filters for i in indexes) else None
         )
+        # match() returns a new list, so listeners can be removed from the
+        # index during the iteration.
+        if len(indexes) == 1:
+            listeners = indexes[0].match(data)
+        else:
+            # A listener can subscribe to several matching patterns, but
+            # receives each event only once.
+            listeners = list(
+                dict.fromkeys(li for i in indexes for li in i.match(data))
+            )
+        for listener in listeners:
+            listener.send(notification.event)
+        self._buffer_notification(notification)
+        self._stats.events_received.inc(notification.subsystem)
+        self._stats.events_delivered.inc(len(listeners))
+        candidates = sum(len(i) for i in indexes)
+        self._stats.filter_rejections.inc(candidates - len(listeners))
+        self._stats.fanout_duration.observe(time.perf_counter() - start)
+        return len(listeners)
+
+    def _buffer_notification(self, notification: Notification) -> None:
+        if self._config.replay_depth <= 0:
+            return
+        buffer = self._replay_buffers.pop(notification.subsystem, None)
+        if buffer is None:
+            buffer = ReplayBuffer(
+                self._config.replay_depth, self._config.replay_max_age
+            )
+        buffer.append(notification)
+        # Re-insert the buffer to keep the dict ordered by last use.
+        self._replay_buffers[notification.subsystem] = buffer
+        self._expire_replay_buffers()
+
+    def _expire_replay_buffers(self) -> None:
+        """Remove buffers of subsystems that had no recent notifications."""
+        limit = time.monotonic() - self._config.replay_max_age
+        while self._replay_buffers:
+            subsystem, buffer = next(iter(self._replay_buffers.items()))
+            newest_time = buffer.newest_time
+            if newest_time is not None and newest_time >= limit:
+                break
+            del self._replay_buffers[subsystem]
 
     def disconnect_all(self) -> None:
         for listener in self.all_listeners:
-            listener.disconnect()
+            listener.close()
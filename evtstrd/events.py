@@ -1,9 +1,14 @@
 from __future__ import annotations
 
 import json
+import logging
+from functools import cached_property
 
 from jsonget import JsonValue
 
+from evtstrd.http import encode_chunk
+from evtstrd.util import json_loads
+
 
 class Event:
     """A single event stream event.
@@ -11,6 +16,10 @@ class Event:
     Each event has a type (this is not actually required by the event stream
     protocol) and data. It can optionally have an id. Use of ids is recommended
     to allow safe stream reconnections.
+
+    Events should be treated as immutable once they have been serialized,
+    since the serialized forms are cached. This allows the same event
+    instance to be sent to many listeners while only being encoded once.
     """
 
     def __init__(
@@ -22,8 +31,18 @@ class Event:
 
     def __bytes__(self) -> bytes:
         """Serialize the event for use in event streams."""
+        return self.payload
+
+    @cached_property
+    def payload(self) -> bytes:
+        """The serialized event, as used in event streams."""
         return bytes(str(self), "utf-8")
 
+    @cached_property
+    def frame(self) -> bytes:
+        """The serialized event, wrapped in an HTTP chunk."""
+        return encode_chunk(self.payload)
+
     def __str__(self) -> str:
         """Serialize the event for use in event streams."""
         fields = [("event", self.type), ("data", self.data)]
@@ -33,6 +52,77 @@ class Event:
         return "\r\n".join(lines) + "\r\n\r\n"
 
 
+class Notification:
+    """An event published to a subsystem.
+
+    The event stream event is created on first access, and is then shared
+    by all listeners that are notified about it.
+    """
+
+    def __init__(
+        self, subsystem: str, event_type: str, data: JsonValue, id: str
+    ) -> None:
+        self.subsystem = subsystem
+        self.type = event_type
+        self.data = data
+        self.id = id
+        self._json_data: bytes | None = None
+
+    @classmethod
+    def from_json(
+        cls, subsystem: str, event_type: str, json_data: bytes, id: str
+    ) -> Notification:
+        """Create a notification from serialized JSON data.
+
+        The data is only parsed when it is accessed. Otherwise, the
+        serialized data is used in the event stream.
+        """
+        notification = cls.__new__(cls)
+        notification.subsystem = subsystem
+        notification.type = event_type
+        notification.id = id
+        notification._json_data = json_data
+        return notification
+
+    @cached_property
+    def data(self) -> JsonValue:
+        # Only called for notifications created by from_json().
+        assert self._json_data is not None
+        try:
+            data: JsonValue = json_loads(self._json_data)
+        except ValueError:
+            logging.warning(
+                f"invalid JSON data in '{self.type}' event '{self.id}'"
+            )
+            return None
+        return data
+
+    @cached_property
+    def event(self) -> JSONEvent:
+        if self._json_data is None:
+            return JSONEvent(self.type, self.data, self.id)
+        # Line breaks are insignificant whitespace in serialized JSON, but
+        # would end the data field of the event.
+        text = self._json_data.decode("utf-8", errors="replace")
+        if "\n" in text or "\r" in text:
+            text = text.replace("\r", " ").replace("\n", " ")
+        return JSONEvent(self.type, text, self.id)
+
+
+class Comment(Event):
+    """A comment line, which is ignored by clients.
+
+    Comments are used as small heartbeats to keep connections open.
+    """
+
+    def __init__(self, text: str = "") -> None:
+        super().__init__("")
+        self.text = text
+
+    def __str__(self) -> str:
+        return f":{self.text}\n\n"
+
+
 class PingEvent(Event):
     def __init__(self) -> None:
         super().__init__("ping")
@@ -53,3 +143,8 @@ class JSONEvent(Event):
 class LogoutEvent(JSONEvent):
     def __init__(self) -> None:
         super().__init__("logout", {"reason": "expire"})
+
+
+class DisconnectEvent(JSONEvent):
+    def __init__(self, reason: str) -> None:
+        super().__init__("disconnect", {"reason": reason})
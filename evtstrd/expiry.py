@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import heapq
+import itertools
+from collections.abc import Callable
+
+from evtstrd.date import naive_utc, utcnow
+from evtstrd.listener import Listener
+
+
+class ExpiryScheduler:
+    """Call a function when the authorization of a listener expires.
+
+    Expiry times are kept in a min-heap, and a single task sleeps until the
+    next expiry time. All listeners that expire at the same time are
+    handled in one pass. The task is only running while there are
+    listeners with an expiry time.
+
+    Expiry times are either naive datetimes in UTC, or timezone-aware
+    datetimes.
+    """
+
+    def __init__(self, on_expire: Callable[[Listener], None]) -> None:
+        self._on_expire = on_expire
+        self._heap: list[tuple[datetime.datetime, int, Listener]] = []
+        self._expiry_times: dict[Listener, datetime.datetime] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._expiry_times)
+
+    def add(self, listener: Listener, expire: datetime.datetime) -> None:
+        expire = naive_utc(expire)
+        self._expiry_times[listener] = expire
+        entry = (expire, next(self._counter), listener)
+        heapq.heappush(self._heap, entry)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        elif self._heap[0] is entry:
+            self._wakeup.set()
+
+    def remove(self, listener: Listener) -> None:
+        """Remove a listener, if it was added.
+
+        The listener's heap entry is discarded lazily.
+        """
+        if self._expiry_times.pop(listener, None) is None:
+            return
+        # Compact the heap if it consists mostly of discarded entries.
+        if len(self._heap) > 2 * len(self._expiry_times) + 64:
+            self._heap = [
+                e for e in self._heap if self._expiry_times.get(e[2]) == e[0]
+            ]
+            heapq.heapify(self._heap)
+        if not self._expiry_times and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self._heap.clear()
+
+    def expire(self, now: datetime.datetime) -> list[Listener]:
+        """Handle and return all listeners that expire until now."""
+        expired = []
+        while self._heap and self._heap[0][0] <= now:
+            expire, _, listener = heapq.heappop(self._heap)
+            if self._expiry_times.get(listener) == expire:
+                del self._expiry_times[listener]
+                expired.append(listener)
+        for listener in expired:
+            self._on_expire(listener)
+        return expired
+
+    async def _run(self) -> None:
+        try:
+            while self._heap:
+                now = utcnow()
+                self.expire(now)
+                if not self._heap:
+                    break
+                delay = (self._heap[0][0] - now).total_seconds()
+                self._wakeup.clear()
+                try:
+                    async with asyncio.timeout(delay):
+                        await self._wakeup.wait()
+                except TimeoutError:
+                    pass
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
@@ -1,40 +1,124 @@
 import datetime
 import re
 from collections.abc import Callable
-from typing import Any, TypeAlias, cast
+from functools import cached_property
+from typing import Any, Final, TypeAlias, cast
 
-from jsonget import JsonType, JsonValue, json_get
+from jsonget import JsonType, JsonValue
 
 from evtstrd.date import parse_iso_date
 
-_Comparator: TypeAlias = Callable[[str, Any], bool]
+MEMBERSHIP: Final = "~in"
+PREFIX: Final = "^="
+
+# Filters compare the event value v with the filter value c. For each
+# operator, this maps to a function that binds "v op c" to c. Where
+# possible, the comparison is a method of c, for example the reflected
+# comparison for "v < c".
+_comparators: dict[str, Callable[[Any], Callable[[Any], bool]]] = {
+    "=": lambda c: c.__eq__,
+    ">": lambda c: c.__lt__,
+    ">=": lambda c: c.__le__,
+    "<": lambda c: c.__gt__,
+    "<=": lambda c: c.__ge__,
+    MEMBERSHIP: lambda c: c.__contains__,
+    PREFIX: lambda c: lambda v: v.startswith(c),
+}
+
+# Maps filter accessors to the values extracted from a single message.
+FieldValues: TypeAlias = dict[tuple[Any, ...], Any]
+
+# Returned for fields that are missing or have the wrong type.
+_INVALID: Final = object()
 
 
 class Filter:
     def __init__(
-        self, field: str, comparator: _Comparator, value: Any, string: str
+        self,
+        field: str,
+        operator: str,
+        value: Any,
+        string: str,
     ) -> None:
         self._field = field
-        self._comparator = comparator
-        self._value = value
+        self._path = tuple(field.split("/"))
+        self.operator = operator
+        self.value = value
         self.string = string
-
-    def __call__(self, message: JsonValue) -> bool:
-        try:
-            v = self._get_value(message)
-        except ValueError:
-            return False
-        return self._comparator(v, self._value)
+        self._field_type = cast(type, self.field_type)
+        self._compare = _comparators[operator](value)
+
+    def __call__(
+        self, message: JsonValue, values: FieldValues | None = None
+    ) -> bool:
+        """Return whether the message matches this filter.
+
+        If values is given, extracted values are memoized in it, so that
+        filters on the same field extract the value only once. It must
+        only be used for a single message.
+        """
+        v = self._lookup(message, values)
+        # Field values have the type of the filter value, so the
+        # comparison never returns NotImplemented.
+        return v is not _INVALID and self._compare(v) is True
 
     def __str__(self) -> str:
         return self.string
 
-    def _get_value(self, message: JsonValue) -> Any:
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Filter):
+            return NotImplemented
+        return self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    @cached_property
+    def key(self) -> tuple[Any, ...]:
+        """A key that is equal for filters that behave identically."""
+        return self.accessor + (self.operator, self.value)
+
+    @cached_property
+    def accessor(self) -> tuple[Any, ...]:
+        """A key that is equal for filters that extract the same value."""
+        return type(self), self._field, self.field_type
+
+    def get_value(
+        self, message: JsonValue, values: FieldValues | None = None
+    ) -> Any:
+        """Extract the value to compare from a message.
+
+        Raise ValueError if the field is missing or has the wrong type.
+        """
+        v = self._lookup(message, values)
+        if v is _INVALID:
+            raise ValueError(f"invalid or missing field '{self._field}'")
+        return v
+
+    def _lookup(self, message: JsonValue, values: FieldValues | None) -> Any:
+        if values is None:
+            return self._extract(message)
+        accessor = self.accessor
+        try:
+            return values[accessor]
+        except KeyError:
+            v = values[accessor] = self._extract(message)
+            return v
+
+    def _extract(self, message: Any) -> Any:
+        for name in self._path:
+            if not isinstance(message, dict):
+                return _INVALID
+            try:
+                message = message[name]
+            except KeyError:
+                return _INVALID
+        if not isinstance(message, self._field_type):
+            return _INVALID
         try:
-            v = json_get(message, self._field, self.field_type)
-        except (ValueError, TypeError) as exc:
-            raise ValueError(str(exc)) from exc
-        return self.parse_value(cast(Any, v))
+            return self.parse_value(cast(Any, message))
+        except ValueError:
+            return _INVALID
 
     @property
     def field_type(self) -> JsonType:
@@ -47,7 +131,9 @@ class Filter:
 class StringFilter(Filter):
     @property
     def field_type(self) -> JsonType:
-        return type(self._value)
+        if self.operator == MEMBERSHIP:
+            return type(next(iter(self.value)))
+        return type(self.value)
 
     def parse_value(self, v: str) -> str:
         return v
@@ -62,14 +148,9 @@ class DateFilter(Filter):
         return parse_iso_date(v)
 
 
-_filter_re = re.compile(r"^([a-z.-]+)(=|>=|<=|<|>)(.*)$")
-_comparators = {
-    "=": lambda v1, v2: v1 == v2,
-    ">": lambda v1, v2: v1 > v2,
-    ">=": lambda v1, v2: v1 >= v2,
-    "<": lambda v1, v2: v1 < v2,
-    "<=": lambda v1, v2: v1 <= v2,
-}
+_filter_re = re.compile(r"^([a-z.-]+)(=|>=|<=|<|>|~in|\^=)(.*)$")
+_set_re = re.compile(r"^\((?:'[^']*'|[^,'()]+)(?:,(?:'[^']*'|[^,'()]+))*\)$")
+_set_item_re = re.compile(r"'[^']*'|[^,'()]+")
 
 
 def _parse_value(v: str) -> str | int | datetime.date:
@@ -82,15 +163,32 @@ def _parse_value(v: str) -> str | int | datetime.date:
     return int(v)
 
 
+def _parse_set(v: str) -> frozenset[str | int | datetime.date]:
+    if not _set_re.match(v):
+        raise ValueError(f"invalid set '{v}'")
+    values = frozenset(_parse_value(i) for i in _set_item_re.findall(v))
+    if len({type(i) for i in values}) != 1:
+        raise ValueError("set values must have the same type")
+    return values
+
+
 def parse_filter(string: str) -> Filter:
     m = _filter_re.match(string)
     if not m:
         raise ValueError(f"invalid filter '{string}'")
     field = m.group(1).replace(".", "/")
-    comparator = _comparators[m.group(2)]
-    value = _parse_value(m.group(3))
-    if type(value) is datetime.date:
+    operator = m.group(2)
+    value: Any
+    if operator == MEMBERSHIP:
+        value = _parse_set(m.group(3))
+        value_type = type(next(iter(value)))
+    else:
+        value = _parse_value(m.group(3))
+        value_type = type(value)
+        if operator == PREFIX and value_type is not str:
+            raise ValueError("prefix must be a string")
+    if value_type is datetime.date:
         cls: type[Filter] = DateFilter
     else:
         cls = StringFilter
-    return cls(field, comparator, value, string)
+    return cls(field, operator, value, string)
@@ -0,0 +1,131 @@
+"""Binary framing for the publisher socket.
+
+Publishers opt into binary framing by sending MAGIC as the first bytes of
+a connection. Otherwise, the connection uses JSON messages, one per line.
+
+After MAGIC, each event is sent as one frame. A frame starts with a
+header of four unsigned big-endian integers: the lengths of the
+subsystem, the event type, and the id (2 bytes each), and the length of
+the payload (4 bytes). The header is followed by the UTF-8 encoded
+subsystem, event type, and id, and the payload, which must be a
+serialized JSON object. The payload is only parsed if a filter needs to
+inspect it. Otherwise, it is sent to listeners as is.
+"""
+
+from __future__ import annotations
+
+import logging
+import struct
+from asyncio import StreamReader
+
+from evtstrd.events import Notification
+from evtstrd.exc import DisconnectedError
+from evtstrd.routing import is_pattern
+
+MAGIC = b"\x00EVTSTRD\x01"
+
+# Larger frames are discarded.
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+_HEADER = struct.Struct("!HHHI")
+
+
+def encode_frame(
+    subsystem: str, event_type: str, id: str, payload: bytes
+) -> bytes:
+    fields = [s.encode("utf-8") for s in (subsystem, event_type, id)]
+    lengths = [len(f) for f in fields]
+    return b"".join([_HEADER.pack(*lengths, len(payload)), *fields, payload])
+
+
+class BinaryFrameReader:
+    """Read binary event frames from a stream.
+
+    The caller must have consumed MAGIC already.
+    """
+
+    def __init__(
+        self,
+        reader: StreamReader,
+        *,
+        read_size: int = 256 * 1024,
+        max_frame_size: int = MAX_FRAME_SIZE,
+    ) -> None:
+        self._reader = reader
+        self._read_size = read_size
+        self._max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        # Bytes of an overlong frame that still need to be discarded.
+        self._discard = 0
+
+    async def read(self) -> list[Notification]:
+        """Read all events that are available.
+
+        Wait until at least one frame was received. Invalid frames are
+        skipped, so the returned list can be empty. Raise
+        DisconnectedError when the stream has ended.
+        """
+        while True:
+            data = await self._reader.read(self._read_size)
+            if not data:
+                if self._buffer or self._discard:
+                    logging.warning(
+                        "connection closed in the middle of a frame"
+                    )
+                raise DisconnectedError()
+            if self._discard:
+                skipped = min(self._discard, len(data))
+                self._discard -= skipped
+                data = data[skipped:]
+            self._buffer += data
+            notifications = self._parse_frames()
+            if notifications is not None:
+                return notifications
+
+    def _parse_frames(self) -> list[Notification] | None:
+        """Parse all complete frames in the buffer.
+
+        Return None if the buffer does not contain a complete frame.
+        """
+        notifications: list[Notification] | None = None
+        buffer = self._buffer
+        offset = 0
+        while len(buffer) - offset >= _HEADER.size:
+            lengths = _HEADER.unpack_from(buffer, offset)
+            size = _HEADER.size + sum(lengths)
+            if size > self._max_frame_size:
+                logging.warning("discarding overlong frame")
+                self._discard = max(0, offset + size - len(buffer))
+                offset = min(len(buffer), offset + size)
+                notifications = notifications or []
+                continue
+            if len(buffer) - offset < size:
+                break
+            notification = _parse_frame(buffer, offset, lengths)
+            offset += size
+            if notifications is None:
+                notifications = []
+            if notification is not None:
+                notifications.append(notification)
+        del buffer[:offset]
+        return notifications
+
+
+def _parse_frame(
+    buffer: bytearray, offset: int, lengths: tuple[int, int, int, int]
+) -> Notification | None:
+    start = offset + _HEADER.size
+    fields = []
+    for length in lengths[:3]:
+        try:
+            fields.append(buffer[start : start + length].decode("utf-8"))
+        except UnicodeDecodeError:
+            logging.error("received invalid frame: invalid UTF-8 in header")
+            return None
+        start += length
+    subsystem, event_type, id = fields
+    if is_pattern(subsystem):
+        logging.error(f"cannot notify subsystem pattern '{subsystem}'")
+        return None
+    payload = bytes(buffer[start : start + lengths[3]])
+    return Notification.from_json(subsystem, event_type, payload, id)
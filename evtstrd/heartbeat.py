@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import time
+
+from evtstrd.events import Event
+from evtstrd.listener import Listener
+
+_BUCKET_COUNT = 20
+
+
+class HeartbeatScheduler:
+    """Send heartbeats to idle listeners.
+
+    Instead of running one timer per listener, listeners are spread over a
+    fixed number of buckets. A single task visits one bucket per tick, so
+    that each listener is visited once per interval, and sends a heartbeat
+    to all listeners in that bucket that were not written to during the
+    last interval.
+
+    The task is only running while there are listeners.
+    """
+
+    def __init__(
+        self,
+        interval: float,
+        heartbeat: Event,
+        *,
+        bucket_count: int = _BUCKET_COUNT,
+    ) -> None:
+        self._interval = interval
+        self._heartbeat = heartbeat
+        self._buckets: list[dict[Listener, None]] = [
+            {} for _ in range(bucket_count)
+        ]
+        self._current_bucket = 0
+        self._listener_count = 0
+        self._task: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return self._listener_count
+
+    def add(self, listener: Listener) -> None:
+        """Add a listener and send it an initial heartbeat."""
+        bucket = self._buckets[listener.id % len(self._buckets)]
+        if listener in bucket:
+            return
+        bucket[listener] = None
+        self._listener_count += 1
+        listener.send(self._heartbeat)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def remove(self, listener: Listener) -> None:
+        bucket = self._buckets[listener.id % len(self._buckets)]
+        if listener in bucket:
+            del bucket[listener]
+            self._listener_count -= 1
+        if self._listener_count == 0 and self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        tick = self._interval / len(self._buckets)
+        while True:
+            await asyncio.sleep(tick)
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Send heartbeats to idle listeners in the next bucket.
+
+        Return the number of heartbeats sent.
+        """
+        bucket = self._buckets[self._current_bucket]
+        self._current_bucket = (self._current_bucket + 1) % len(self._buckets)
+        idle_since = time.monotonic() - self._interval
+        # Sending can close listeners, which removes them from the bucket.
+        idle = [li for li in bucket if li.last_write <= idle_since]
+        for listener in idle:
+            listener.send(self._heartbeat)
+        return len(idle)
@@ -1,11 +1,16 @@
+import asyncio
 import logging
 from asyncio.streams import StreamReader, StreamWriter
-from collections.abc import Iterable
+from collections.abc import Iterable, Sequence
 from http import HTTPStatus
 from typing import TypeAlias
 
 Header: TypeAlias = tuple[str, str]
 
+MAX_HEAD_SIZE = 8192  # in bytes
+MAX_HEADERS = 100
+HEAD_TIMEOUT = 10  # in seconds
+
 
 class HTTPError(Exception):
     def __init__(
@@ -38,6 +43,14 @@ class NotFoundError(HTTPError):
         super().__init__(HTTPStatus.NOT_FOUND, message)
 
 
+class HeaderTooLargeError(HTTPError):
+    def __init__(self) -> None:
+        super().__init__(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+            "request header fields too large",
+        )
+
+
 class MethodNotAllowedError(HTTPError):
     def __init__(self, method: str) -> None:
         message = f"method {method} not allowed"
@@ -47,44 +60,62 @@ class MethodNotAllowedError(HTTPError):
 
 async def read_http_head(
     reader: StreamReader,
+    *,
+    max_size: int = MAX_HEAD_SIZE,
+    max_headers: int = MAX_HEADERS,
+    timeout: float | None = HEAD_TIMEOUT,
 ) -> tuple[str, str, dict[str, str]]:
-    async def read_line() -> str:
-        line_ = await reader.readline()
-        try:
-            return line_.decode("ascii").strip()
-        except UnicodeDecodeError as exc:
-            raise BadRequestError("non-ASCII characters in header") from exc
-
-    async def read_request_line() -> tuple[str, str]:
-        line_ = await read_line()
-        try:
-            m, p, http_tag = line_.split(" ")
-        except ValueError as exc:
-            raise BadRequestError("invalid request line") from exc
-        if http_tag != "HTTP/1.1":
-            raise BadRequestError("unsupported HTTP version")
-        if m not in ["HEAD", "GET", "POST", "PUT"]:
-            raise NotImplementedError()
-        return m, p
-
-    def parse_header_line(li: str) -> tuple[str, ...]:
-        try:
-            return tuple(li.split(": ", maxsplit=1))
-        except ValueError as exc:
-            raise BadRequestError("invalid header line") from exc
-
-    method, path = await read_request_line()
+    """Read and parse the request line and headers of an HTTP request.
+
+    Raise an HTTPError if the head is invalid, larger than max_size bytes,
+    has more than max_headers headers, or was not received within timeout
+    seconds.
+    """
+    try:
+        async with asyncio.timeout(timeout):
+            head = await reader.readuntil(b"\r\n\r\n")
+    except TimeoutError as exc:
+        raise HTTPError(
+            HTTPStatus.REQUEST_TIMEOUT, "timeout while reading request"
+        ) from exc
+    except asyncio.LimitOverrunError as exc:
+        raise HeaderTooLargeError() from exc
+    except asyncio.IncompleteReadError as exc:
+        raise BadRequestError("incomplete request head") from exc
+    if len(head) > max_size:
+        raise HeaderTooLargeError()
+    try:
+        text = head.decode("ascii")
+    except UnicodeDecodeError as exc:
+        raise BadRequestError("non-ASCII characters in header") from exc
+
+    request_line, *header_lines = text[:-4].split("\r\n")
+    method, path = _parse_request_line(request_line)
+    if len(header_lines) > max_headers:
+        raise HeaderTooLargeError()
     headers = {}
-    while True:
-        line = await read_line()
-        if not line:
-            break
-        he, va = parse_header_line(line)
-        headers[he.lower()] = va
-
+    for line in header_lines:
+        name, sep, value = line.partition(":")
+        if not sep or not name or name != name.strip():
+            raise BadRequestError("invalid header line")
+        headers[name.lower()] = value.strip()
     return method, path, headers
 
 
+def _parse_request_line(line: str) -> tuple[str, str]:
+    try:
+        method, path, http_tag = line.split(" ")
+    except ValueError as exc:
+        raise BadRequestError("invalid request line") from exc
+    if http_tag != "HTTP/1.1":
+        raise BadRequestError("unsupported HTTP version")
+    if method not in ["HEAD", "GET", "POST", "PUT"]:
+        raise HTTPError(
+            HTTPStatus.NOT_IMPLEMENTED, f"method {method} not implemented"
+        )
+    return method, path
+
+
 def write_http_head(
     writer: StreamWriter, code: HTTPStatus, headers: Iterable[Header]
 ) -> None:
@@ -111,17 +142,30 @@ def write_http_error(writer: StreamWriter, exc: HTTPError) -> None:
     write_response(writer, exc.status, exc.headers, body)
 
 
+def encode_chunk(data: bytes) -> bytes:
+    """Wrap data in a chunk for chunked transfer encoding."""
+    return b"%x\r\n%b\r\n" % (len(data), data)
+
+
 def write_chunk(writer: StreamWriter, data: bytes) -> None:
-    writer.write(bytes(hex(len(data))[2:], "ascii"))
-    writer.write(b"\r\n")
-    writer.write(data)
-    writer.write(b"\r\n")
-    encoded = (
-        data.decode("utf-8", errors="ignore")
-        .replace("\r", "\\r")
-        .replace("\n", "\\n")
-    )
-    logging.debug(f"wrote chunk to listener: {encoded}")
+    write_frames(writer, [encode_chunk(data)])
+
+
+def write_frames(writer: StreamWriter, frames: Sequence[bytes]) -> None:
+    """Write chunks that were already encoded with encode_chunk()."""
+    if len(frames) == 1:
+        writer.write(frames[0])
+    else:
+        writer.writelines(frames)
+    # Formatting the log message is expensive, so avoid it if possible.
+    if logging.root.isEnabledFor(logging.DEBUG):
+        for frame in frames:
+            encoded = (
+                frame.decode("utf-8", errors="ignore")
+                .replace("\r", "\\r")
+                .replace("\n", "\\n")
+            )
+            logging.debug(f"wrote chunk to listener: {encoded}")
 
 
 def write_last_chunk(writer: StreamWriter) -> None:
@@ -1,18 +1,24 @@
 from __future__ import annotations
 
 import asyncio
+import datetime
 import json
 import logging
+import math
 import ssl
+import time
 from asyncio import AbstractServer, StreamReader, StreamWriter
-from collections.abc import Mapping
+from collections.abc import Iterable, Mapping
 from email.utils import formatdate
 from http import HTTPStatus
 from ssl import SSLContext
+from typing import Any, Protocol
 from urllib.parse import ParseResult, parse_qs, urlparse
 
-from evtstrd.auth import check_auth
+from evtstrd.auth import Authorizer, load_auth_plugin
+from evtstrd.compression import negotiate_encoding
 from evtstrd.config import Config
+from evtstrd.date import naive_utc
 from evtstrd.dispatcher import Dispatcher
 from evtstrd.filters import Filter, parse_filter
 from evtstrd.http import (
@@ -22,11 +28,32 @@ from evtstrd.http import (
     MethodNotAllowedError,
     NotFoundError,
     read_http_head,
+    write_chunk,
     write_http_error,
     write_http_head,
+    write_last_chunk,
     write_response,
 )
-from evtstrd.stats import ServerStats, json_stats
+from evtstrd.metrics import MetricsSnapshot, render_metrics
+from evtstrd.stats import (
+    JSONStats,
+    JSONSummary,
+    ServerStats,
+    iter_json_stats,
+    json_summary,
+    metrics_snapshot,
+)
+
+
+class StatsCollector(Protocol):
+    """Collects the statistics of all worker processes."""
+
+    async def collect_stats(self) -> JSONStats: ...
+    async def collect_summary(self) -> JSONSummary: ...
+    async def collect_metrics(self) -> MetricsSnapshot: ...
+
+
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
 
 
 class HTTPServer:
@@ -35,15 +62,24 @@ class HTTPServer:
         config: Config,
         dispatcher: Dispatcher,
         stats: ServerStats,
+        *,
+        collector: StatsCollector | None = None,
     ) -> None:
         self._config = config
-        self._handler = HTTPHandler(config, dispatcher, stats)
+        self._handler = HTTPHandler(
+            config, dispatcher, stats, collector=collector
+        )
         self._server: AbstractServer | None = None
 
     async def __aenter__(self) -> None:
         ssl_context = self._ssl_context()
         self._server = await asyncio.start_server(
-            self._handler.handle, port=self._config.http_port, ssl=ssl_context
+            self._handler.handle,
+            port=self._config.http_port,
+            ssl=ssl_context,
+            limit=self._config.max_head_size,
+            # Worker processes share the port.
+            reuse_port=self._config.workers > 1,
         )
 
     def _ssl_context(self) -> SSLContext | None:
@@ -68,14 +104,30 @@ class HTTPHandler:
         config: Config,
         dispatcher: Dispatcher,
         stats: ServerStats,
+        *,
+        collector: StatsCollector | None = None,
     ) -> None:
         self._config = config
         self._dispatcher = dispatcher
         self._stats = stats
+        # Statistics are only collected from other processes in
+        # multi-process mode.
+        self._collector = collector
+        self._authorizer = Authorizer(
+            load_auth_plugin(),
+            cache_ttl=config.auth_cache_ttl,
+            cache_size=config.auth_cache_size,
+            cache_headers=config.auth_cache_headers,
+        )
 
     async def handle(self, reader: StreamReader, writer: StreamWriter) -> None:
         try:
-            method, path, headers = await read_http_head(reader)
+            method, path, headers = await read_http_head(
+                reader,
+                max_size=self._config.max_head_size,
+                max_headers=self._config.max_headers,
+                timeout=self._config.head_timeout,
+            )
             await self._handle_request(reader, writer, method, path, headers)
         except HTTPError as exc:
             write_http_error(writer, exc)
@@ -107,7 +159,11 @@ class HTTPHandler:
         elif url.path == "/stats":
             if method != "GET":
                 raise MethodNotAllowedError(method)
-            await self._handle_get_stats(writer, headers)
+            await self._handle_get_stats(writer, url, headers)
+        elif url.path == "/metrics":
+            if method != "GET":
+                raise MethodNotAllowedError(method)
+            await self._handle_get_metrics(writer, headers)
         else:
             raise NotFoundError(path)
 
@@ -121,14 +177,20 @@ class HTTPHandler:
         url: ParseResult,
         headers: Mapping[str, str],
     ) -> None:
-        subsystem, filters = self._parse_event_args(url.query)
-        expire, _ = await check_auth("events", headers, subsystem=subsystem)
+        subscriptions, max_rate = self._parse_event_args(url.query)
+        expire = await self._check_events_auth(headers, subscriptions)
         response_headers = self._default_headers() + [
             ("Transfer-Encoding", "chunked"),
             ("Content-Type", "text/event-stream"),
             ("Connection", "keep-alive"),
             ("Keep-Alive", "timeout=5, max=100"),
         ]
+        encoding = None
+        if self._config.compression:
+            encoding = negotiate_encoding(headers.get("accept-encoding"))
+            response_headers.append(("Vary", "Accept-Encoding"))
+            if encoding is not None:
+                response_headers.append(("Content-Encoding", encoding))
         if "origin" in headers:
             response_headers.extend(
                 [
@@ -139,24 +201,102 @@ class HTTPHandler:
         write_http_head(writer, HTTPStatus.OK, response_headers)
         referer = headers.get("referer")
         await self._dispatcher.handle_listener(
-            reader, writer, referer, subsystem, filters, expire=expire
+            reader,
+            writer,
+            referer,
+            subscriptions,
+            expire=expire,
+            last_event_id=headers.get("last-event-id"),
+            encoding=encoding,
+            max_rate=max_rate,
         )
 
-    def _parse_event_args(self, query: str) -> tuple[str, list[Filter]]:
+    def _parse_event_args(
+        self, query: str
+    ) -> tuple[dict[str, list[Filter]], float | None]:
+        """Parse the subscriptions and the maximum event rate.
+
+        "filter" arguments apply to all subsystems, "filter:<subsystem>"
+        arguments only to the given subsystem.
+        """
         args = parse_qs(query)
         if "subsystem" not in args:
             raise CGIArgumentError("subsystem", "missing argument")
+        common_filters = self._parse_filters("filter", args.get("filter", []))
+        subscriptions = {s: list(common_filters) for s in args["subsystem"]}
+        for name, values in args.items():
+            if not name.startswith("filter:"):
+                continue
+            filters = subscriptions.get(name[len("filter:") :])
+            if filters is None:
+                raise CGIArgumentError(name, "subsystem not subscribed")
+            filters.extend(self._parse_filters(name, values))
+        return subscriptions, self._parse_rate_arg(args, "max-rate")
+
+    def _parse_filters(self, name: str, values: list[str]) -> list[Filter]:
         try:
-            filters = [parse_filter(f) for f in args.get("filter", [])]
+            return [parse_filter(f) for f in values]
         except ValueError as exc:
-            raise CGIArgumentError("filter", "could not parse filter") from exc
-        return args["subsystem"][0], filters
+            raise CGIArgumentError(name, "could not parse filter") from exc
 
     async def _handle_get_stats(
-        self, writer: StreamWriter, headers: Mapping[str, str]
+        self,
+        writer: StreamWriter,
+        url: ParseResult,
+        headers: Mapping[str, str],
     ) -> None:
-        await check_auth("stats", headers)
-        j = json_stats(self._stats, self._dispatcher.all_listeners)
+        await self._check_auth("stats", headers)
+        view, offset, limit = self._parse_stats_args(url.query)
+        if view == "summary":
+            if self._collector is None:
+                summary = json_summary(self._stats)
+            else:
+                summary = await self._collector.collect_summary()
+            self._write_json(writer, summary)
+        elif self._collector is None:
+            await self._stream_local_stats(writer, offset, limit)
+        else:
+            j = await self._collector.collect_stats()
+            end = None if limit is None else offset + limit
+            j["connections"] = j["connections"][offset:end]
+            self._write_json(writer, j)
+
+    def _parse_stats_args(self, query: str) -> tuple[str, int, int | None]:
+        args = parse_qs(query)
+        view = args.get("view", ["full"])[0]
+        if view not in ["full", "summary"]:
+            raise CGIArgumentError("view", "must be 'full' or 'summary'")
+        offset = self._parse_count_arg(args, "offset")
+        limit = self._parse_count_arg(args, "limit")
+        return view, offset or 0, limit
+
+    def _parse_count_arg(
+        self, args: Mapping[str, list[str]], name: str
+    ) -> int | None:
+        if name not in args:
+            return None
+        try:
+            value = int(args[name][0])
+        except ValueError as exc:
+            raise CGIArgumentError(name, "not a number") from exc
+        if value < 0:
+            raise CGIArgumentError(name, "must not be negative")
+        return value
+
+    def _parse_rate_arg(
+        self, args: Mapping[str, list[str]], name: str
+    ) -> float | None:
+        if name not in args:
+            return None
+        try:
+            value = float(args[name][0])
+        except ValueError as exc:
+            raise CGIArgumentError(name, "not a number") from exc
+        if not value > 0 or math.isinf(value):
+            raise CGIArgumentError(name, "must be a positive number")
+        return value
+
+    def _write_json(self, writer: StreamWriter, j: object) -> None:
         response = json.dumps(j).encode("utf-8")
         response_headers = self._default_headers() + [
             ("Connection", "close"),
@@ -166,3 +306,70 @@ class HTTPHandler:
         write_http_head(writer, HTTPStatus.OK, response_headers)
         writer.write(response)
         writer.close()
+
+    async def _stream_local_stats(
+        self, writer: StreamWriter, offset: int, limit: int | None
+    ) -> None:
+        response_headers = self._default_headers() + [
+            ("Connection", "close"),
+            ("Content-Type", "application/json"),
+            ("Transfer-Encoding", "chunked"),
+        ]
+        write_http_head(writer, HTTPStatus.OK, response_headers)
+        listeners = self._dispatcher.all_listeners
+        pieces = iter_json_stats(
+            self._stats, listeners, offset=offset, limit=limit
+        )
+        for piece in pieces:
+            if piece:
+                write_chunk(writer, piece.encode("utf-8"))
+            await writer.drain()
+            # Let other tasks run between pieces.
+            await asyncio.sleep(0)
+        write_last_chunk(writer)
+        writer.close()
+
+    async def _handle_get_metrics(
+        self, writer: StreamWriter, headers: Mapping[str, str]
+    ) -> None:
+        await self._check_auth("metrics", headers)
+        if self._collector is None:
+            snapshot = metrics_snapshot(
+                self._stats, self._dispatcher.all_listeners
+            )
+        else:
+            snapshot = await self._collector.collect_metrics()
+        response = render_metrics(snapshot).encode("utf-8")
+        response_headers = self._default_headers() + [
+            ("Connection", "close"),
+            ("Content-Type", METRICS_CONTENT_TYPE),
+            ("Content-Length", str(len(response))),
+        ]
+        write_http_head(writer, HTTPStatus.OK, response_headers)
+        writer.write(response)
+        writer.close()
+
+    async def _check_events_auth(
+        self, headers: Mapping[str, str], subsystems: Iterable[str]
+    ) -> datetime.datetime | None:
+        """Check the authorization for each subsystem.
+
+        Return the earliest expiry time.
+        """
+        results = await asyncio.gather(
+            *[
+                self._check_auth("events", headers, subsystem=s)
+                for s in subsystems
+            ]
+        )
+        expiry_times = [naive_utc(e) for e, _ in results if e is not None]
+        return min(expiry_times, default=None)
+
+    async def _check_auth(
+        self, route: str, headers: Mapping[str, str], **kwargs: Any
+    ) -> tuple[datetime.datetime | None, Any]:
+        start = time.perf_counter()
+        try:
+            return await self._authorizer.check(route, headers, **kwargs)
+        finally:
+            self._stats.auth_duration.observe(time.perf_counter() - start)
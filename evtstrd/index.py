@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from jsonget import JsonValue
+
+from evtstrd.filters import MEMBERSHIP, FieldValues, Filter
+from evtstrd.listener import Listener
+
+
+class _FilterGroup:
+    """Listeners that share the same set of filters."""
+
+    def __init__(self, filters: frozenset[Filter]) -> None:
+        self.filters = filters
+        # Filters are ordered so that evaluation is deterministic.
+        self.ordered_filters = sorted(filters, key=str)
+        # Prefer equality filters, as they are more selective than
+        # membership filters.
+        self.index_filter = next(
+            (f for f in self.ordered_filters if f.operator == "="),
+            next(
+                (f for f in self.ordered_filters if f.operator == MEMBERSHIP),
+                None,
+            ),
+        )
+        self.listeners: dict[Listener, None] = {}
+
+
+def _indexed_values(f: Filter) -> Iterable[Any]:
+    """Return the field values for which an index filter can match."""
+    return f.value if f.operator == MEMBERSHIP else (f.value,)
+
+
+class _EqualityIndex:
+    """Filter groups indexed by the values of equality or membership filters.
+
+    Groups with a membership filter are indexed by each value of the set.
+    """
+
+    def __init__(self, accessor: Filter) -> None:
+        # All filters in this index share this filter's accessor.
+        self.accessor = accessor
+        self.groups: dict[Any, dict[_FilterGroup, None]] = {}
+
+
+class FilterIndex:
+    """The listeners of a subsystem, grouped and indexed by their filters.
+
+    Listeners with the same set of filters share a filter group, and each
+    distinct filter is evaluated at most once per event. Groups that contain
+    an equality or membership filter are indexed by that filter's values,
+    so that only groups that can possibly match an event are considered.
+    """
+
+    def __init__(self) -> None:
+        self._groups: dict[frozenset[Filter], _FilterGroup] = {}
+        self._listener_groups: dict[Listener, _FilterGroup] = {}
+        self._unindexed: dict[_FilterGroup, None] = {}
+        self._equality_indexes: dict[tuple[Any, ...], _EqualityIndex] = {}
+
+    def __len__(self) -> int:
+        return len(self._listener_groups)
+
+    def __iter__(self) -> Iterator[Listener]:
+        return iter(self._listener_groups)
+
+    @property
+    def group_count(self) -> int:
+        return len(self._groups)
+
+    @property
+    def has_filters(self) -> bool:
+        """Whether any listener has filters.
+
+        If not, match() does not inspect the event data.
+        """
+        return len(self._groups) > (frozenset() in self._groups)
+
+    def add(self, listener: Listener, filters: Iterable[Filter]) -> None:
+        key = frozenset(filters)
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _FilterGroup(key)
+            self._index_group(group)
+        group.listeners[listener] = None
+        self._listener_groups[listener] = group
+
+    def remove(self, listener: Listener) -> None:
+        """Remove a listener from the index.
+
+        Removing a listener that is not in the index is a no-op.
+        """
+        group = self._listener_groups.pop(listener, None)
+        if group is None:
+            return
+        del group.listeners[listener]
+        if not group.listeners:
+            del self._groups[group.filters]
+            self._unindex_group(group)
+
+    def _index_group(self, group: _FilterGroup) -> None:
+        f = group.index_filter
+        if f is None:
+            self._unindexed[group] = None
+            return
+        index = self._equality_indexes.get(f.accessor)
+        if index is None:
+            index = self._equality_indexes[f.accessor] = _EqualityIndex(f)
+        for value in _indexed_values(f):
+            index.groups.setdefault(value, {})[group] = None
+
+    def _unindex_group(self, group: _FilterGroup) -> None:
+        f = group.index_filter
+        if f is None:
+            del self._unindexed[group]
+            return
+        index = self._equality_indexes[f.accessor]
+        for value in _indexed_values(f):
+            groups = index.groups[value]
+            del groups[group]
+            if not groups:
+                del index.groups[value]
+        if not index.groups:
+            del self._equality_indexes[f.accessor]
+
+    def match(self, data: JsonValue) -> list[Listener]:
+        """Return all listeners whose filters match the event data."""
+        # Field values are extracted only once per event, even if they are
+        # used by several filters.
+        values: FieldValues = {}
+        results: dict[Filter, bool] = {}
+        listeners: list[Listener] = []
+        for group in self._candidate_groups(data, values):
+            for f in group.ordered_filters:
+                matched = results.get(f)
+                if matched is None:
+                    matched = results[f] = f(data, values)
+                if not matched:
+                    break
+            else:
+                listeners.extend(group.listeners)
+        return listeners
+
+    def _candidate_groups(
+        self, data: JsonValue, values: FieldValues
+    ) -> Iterator[_FilterGroup]:
+        yield from self._unindexed
+        for index in self._equality_indexes.values():
+            try:
+                value = index.accessor.get_value(data, values)
+            except ValueError:
+                continue
+            groups = index.groups.get(value)
+            if groups is not None:
+                yield from groups
@@ -4,17 +4,25 @@ import asyncio
 import datetime
 import itertools
 import logging
+import time
 from asyncio import StreamReader, StreamWriter
-from collections.abc import Callable, Iterable
+from collections import deque
+from collections.abc import Callable, Iterable, Mapping
 
 from jsonget import JsonValue
 
+from evtstrd.compression import StreamCompressor
 from evtstrd.config import Config
-from evtstrd.events import Event, JSONEvent, LogoutEvent, PingEvent
-from evtstrd.exc import DisconnectedError
-from evtstrd.filters import Filter
-from evtstrd.http import write_chunk, write_last_chunk
-from evtstrd.util import sleep_until
+from evtstrd.events import DisconnectEvent, Event, LogoutEvent
+from evtstrd.filters import FieldValues, Filter
+from evtstrd.http import (
+    encode_chunk,
+    write_chunk,
+    write_frames,
+    write_last_chunk,
+)
+from evtstrd.ratelimit import ConflatingQueue, TokenBucket
+from evtstrd.routing import subsystem_matches
 
 
 class Listener:
@@ -25,71 +33,206 @@ class Listener:
         config: Config,
         reader: StreamReader,
         writer: StreamWriter,
-        subsystem: str,
-        filters: Iterable[Filter],
+        subscriptions: Mapping[str, Iterable[Filter]],
     ) -> None:
         self.id = next(self._id_counter)
         self._config = config
-        self.subsystem = subsystem
-        self.filters = filters
+        # Maps subscribed subsystems to the filters for that subsystem.
+        self.subscriptions = {s: list(f) for s, f in subscriptions.items()}
         self.reader = reader
         self.writer = writer
         self.on_close: Callable[[Listener], None] | None = None
         self.connection_time = datetime.datetime.now()
         self.referer: str | None = None
+        self.dropped_events = 0
+        self.bytes_written = 0
+        self.compressor: StreamCompressor | None = None
+        # Time of the last write to the client, as returned by monotonic().
+        self.last_write = time.monotonic()
+        self._queue: deque[Event] | ConflatingQueue = deque()
+        self._queue_ready = asyncio.Event()
+        self._rate_limit: TokenBucket | None = None
+        self._wakeup: asyncio.TimerHandle | None = None
+        self._closing = False
 
     def __str__(self) -> str:
         return f"#{self.id}"
 
     def __repr__(self) -> str:
-        return "<Listener 0x{:x} for {}>".format(id(self), self.subsystem)
+        subsystems = ", ".join(self.subscriptions)
+        return "<Listener 0x{:x} for {}>".format(id(self), subsystems)
 
     @property
     def remote_host(self) -> str | None:
-        host = self.writer.get_extra_info("peername")[0]
+        peername = self.writer.get_extra_info("peername")
+        if peername is None:
+            return None
+        host = peername[0]
         if host is not None and not isinstance(host, str):
             raise RuntimeError(
                 f"unexpected type of peername host {type(host)}"
             )
         return host
 
-    def notify(
-        self,
-        event_type: str,
-        data: JsonValue,
-        id: str | None = None,
-    ) -> None:
-        if all(f(data) for f in self.filters):
-            logging.debug(f"notifying client {self}")
-            event = JSONEvent(event_type, data, id)
-            try:
-                self._write_event(event)
-            except DisconnectedError:
-                pass
+    def subscribes_to(self, subsystem: str) -> bool:
+        return any(subsystem_matches(p, subsystem) for p in self.subscriptions)
+
+    def matches(self, subsystem: str, data: JsonValue) -> bool:
+        """Return whether the event data passes the filters of a subsystem.
+
+        If several subscribed patterns match the subsystem, the data must
+        pass the filters of one of them. Return False if the listener did
+        not subscribe to the subsystem.
+        """
+        values: FieldValues = {}
+        return any(
+            subsystem_matches(pattern, subsystem)
+            and all(f(data, values) for f in filters)
+            for pattern, filters in self.subscriptions.items()
+        )
+
+    @property
+    def conflated_events(self) -> int:
+        """The number of events replaced by later events with the same id."""
+        if isinstance(self._queue, ConflatingQueue):
+            return self._queue.conflated
+        return 0
+
+    def limit_rate(self, max_rate: float) -> None:
+        """Write at most max_rate events per second to the client.
+
+        Queued events with the same type and id are conflated, so that the
+        client receives the latest event when it is written. Must be called
+        before events are sent.
+        """
+        self._rate_limit = TokenBucket(max_rate, max(1.0, max_rate))
+        self._queue = ConflatingQueue()
+
+    @property
+    def queue_depth(self) -> int:
+        """The number of events waiting to be written to the client."""
+        return len(self._queue)
+
+    @property
+    def closing(self) -> bool:
+        return self._closing
+
+    def send(self, event: Event) -> None:
+        """Queue an event that has passed the listener's filters.
+
+        If the queue is full, the configured slow consumer policy is applied.
+        """
+        if self._closing:
+            return
+        if self.reader.at_eof():
+            self.close()
+            return
+        logging.debug(f"notifying client {self}")
+        if len(self._queue) >= self._config.queue_size:
+            if not self._handle_overflow():
+                return
+        self._queue.append(event)
+        self._queue_ready.set()
+
+    def _handle_overflow(self) -> bool:
+        """Apply the slow consumer policy to a full queue.
+
+        Return whether the new event should still be queued.
+        """
+        policy = self._config.slow_consumer_policy
+        if policy == "drop-oldest":
+            self._queue.popleft()
+            self.dropped_events += 1
+            return True
+        elif policy == "drop-newest":
+            self.dropped_events += 1
+            return False
         else:
-            logging.debug(f"notifying client {self}: not all filters matched")
+            logging.warning(
+                f"disconnecting client {self}: too many pending events"
+            )
+            self.dropped_events += len(self._queue) + 1
+            self._queue.clear()
+            self._queue.append(DisconnectEvent("overflow"))
+            self.close()
+            return False
+
+    async def write_loop(self) -> None:
+        """Write queued events to the client.
 
-    async def ping_loop(self) -> None:
+        Return when the listener was closed and all queued events have been
+        written, or when the connection was lost.
+        """
         while True:
-            try:
-                self._write_event(PingEvent())
-            except DisconnectedError:
-                break
-            await asyncio.sleep(self._config.ping_interval)
-
-    async def logout_at(self, time: datetime.datetime) -> None:
-        await sleep_until(time)
-        self._write_event(LogoutEvent())
+            await self._queue_ready.wait()
+            self._queue_ready.clear()
+            events = self._take_events()
+            if events:
+                frames = self._frames(events)
+                self.last_write = time.monotonic()
+                self.bytes_written += sum(len(f) for f in frames)
+                try:
+                    write_frames(self.writer, frames)
+                    await self.writer.drain()
+                except ConnectionError:
+                    self.close()
+                    return
+            if self._closing and not self._queue:
+                return
+
+    def _take_events(self) -> list[Event]:
+        """Remove the events that can be written now from the queue.
+
+        If the listener's rate is limited and not all events can be written
+        yet, the write loop is woken up when the next event can be written.
+        All events are written when the listener is closing.
+        """
+        if self._rate_limit is None or self._closing:
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+        n = self._rate_limit.take(len(self._queue))
+        events = [self._queue.popleft() for _ in range(n)]
+        if self._queue and self._wakeup is None:
+            self._wakeup = asyncio.get_running_loop().call_later(
+                self._rate_limit.delay(), self._wake_up
+            )
+        return events
+
+    def _wake_up(self) -> None:
+        self._wakeup = None
+        self._queue_ready.set()
+
+    def _frames(self, events: list[Event]) -> list[bytes]:
+        if self.compressor is None:
+            return [e.frame for e in events]
+        # All events are compressed into a single chunk.
+        payloads = (e.payload for e in events)
+        return [encode_chunk(self.compressor.compress(payloads))]
+
+    def logout(self) -> None:
+        """Send a logout event and close the listener."""
+        self.send(LogoutEvent())
+        self.close()
+
+    def close(self) -> None:
+        """Stop accepting new events.
+
+        Events that have already been queued are still written by the write
+        loop. Calling this method more than once is a no-op.
+        """
+        if self._closing:
+            return
+        self._closing = True
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        self._queue_ready.set()
         if self.on_close:
             self.on_close(self)
 
-    def _write_event(self, event: Event) -> None:
-        if self.reader.at_eof():
-            if self.on_close:
-                self.on_close(self)
-            raise DisconnectedError()
-        write_chunk(self.writer, bytes(event))
-
     def disconnect(self) -> None:
+        if self.compressor is not None:
+            write_chunk(self.writer, self.compressor.finish())
         write_last_chunk(self.writer)
         self.writer.close()
@@ -4,7 +4,8 @@ import sys
 
 from evtstrd.cmdargs import parse_command_line
 from evtstrd.exc import ServerAlreadyRunningError
-from evtstrd.server import run_server
+from evtstrd.server import run_master, run_server, run_worker
+from evtstrd.workers import start_workers
 
 
 def main() -> None:
@@ -14,7 +15,11 @@ def main() -> None:
         logging.root.setLevel(logging.DEBUG)
         logging.getLogger("asyncio").setLevel(logging.DEBUG)
     try:
-        asyncio.run(run_server(config))
+        if config.workers > 1:
+            workers = start_workers(config, run_worker)
+            asyncio.run(run_master(config, workers))
+        else:
+            asyncio.run(run_server(config))
     except ServerAlreadyRunningError:
         print("server already running, exiting", file=sys.stderr)
         sys.exit(1)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import bisect
+import math
+from collections.abc import Iterable, Sequence
+from typing import TypeAlias, TypedDict
+
+
+class MetricFamily(TypedDict):
+    type: str
+    help: str
+    samples: dict[str, float]
+
+
+# Maps metric names to metric families. Samples are keyed by their full
+# name including labels, so that snapshots of several processes can be
+# merged by adding up the samples.
+MetricsSnapshot: TypeAlias = dict[str, MetricFamily]
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(value)
+
+
+class Counter:
+    """A value that only increases."""
+
+    def __init__(self, name: str, help: str) -> None:
+        self.name = name
+        self.help = help
+        self.value = 0.0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def collect(self, snapshot: MetricsSnapshot) -> None:
+        snapshot[self.name] = {
+            "type": "counter",
+            "help": self.help,
+            "samples": {self.name: self.value},
+        }
+
+
+class LabeledCounter:
+    """Counters that are distinguished by the value of a label."""
+
+    def __init__(self, name: str, help: str, label: str) -> None:
+        self.name = name
+        self.help = help
+        self.label = label
+        self.values: dict[str, float] = {}
+
+    def inc(self, label_value: str, amount: float = 1) -> None:
+        self.values[label_value] = self.values.get(label_value, 0) + amount
+
+    def collect(self, snapshot: MetricsSnapshot) -> None:
+        snapshot[self.name] = {
+            "type": "counter",
+            "help": self.help,
+            "samples": {
+                f'{self.name}{{{self.label}="{_escape_label_value(v)}"}}': n
+                for v, n in self.values.items()
+            },
+        }
+
+
+class Gauge:
+    """A value that can go up and down."""
+
+    def __init__(self, name: str, help: str, value: float = 0) -> None:
+        self.name = name
+        self.help = help
+        self.value = value
+
+    def collect(self, snapshot: MetricsSnapshot) -> None:
+        snapshot[self.name] = {
+            "type": "gauge",
+            "help": self.help,
+            "samples": {self.name: self.value},
+        }
+
+
+class Histogram:
+    """The distribution of observed values over a fixed set of buckets."""
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = sorted(buckets)
+        # Not cumulative, the last count is for values above all buckets.
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def observe_all(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.observe(value)
+
+    def collect(self, snapshot: MetricsSnapshot) -> None:
+        samples: dict[str, float] = {}
+        cumulative = 0
+        for bound, count in zip(
+            [*self.buckets, math.inf], self.counts, strict=True
+        ):
+            cumulative += count
+            le = _format_value(bound)
+            samples[f'{self.name}_bucket{{le="{le}"}}'] = cumulative
+        samples[f"{self.name}_sum"] = self.sum
+        samples[f"{self.name}_count"] = cumulative
+        snapshot[self.name] = {
+            "type": "histogram",
+            "help": self.help,
+            "samples": samples,
+        }
+
+
+def merge_metrics(snapshots: Iterable[MetricsSnapshot]) -> MetricsSnapshot:
+    """Merge the metrics of several processes by adding up all samples."""
+    merged: MetricsSnapshot = {}
+    for snapshot in snapshots:
+        for name, family in snapshot.items():
+            if name not in merged:
+                merged[name] = {
+                    "type": family["type"],
+                    "help": family["help"],
+                    "samples": {},
+                }
+            samples = merged[name]["samples"]
+            for key, value in family["samples"].items():
+                samples[key] = samples.get(key, 0) + value
+    return merged
+
+
+def render_metrics(snapshot: MetricsSnapshot) -> str:
+    """Render metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, family in snapshot.items():
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for key, value in family["samples"].items():
+            lines.append(f"{key} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
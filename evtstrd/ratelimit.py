@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import time
+from collections import deque
+from collections.abc import Iterator
+
+from evtstrd.events import Event
+
+_EventKey = tuple[str, str | None]
+
+
+class TokenBucket:
+    """Allow rate actions per second on average.
+
+    Unused tokens accumulate up to capacity, which allows short bursts.
+    The bucket starts full.
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def take(self, n: int) -> int:
+        """Take up to n tokens and return the number of tokens taken."""
+        self._refill()
+        taken = min(n, int(self._tokens))
+        self._tokens -= taken
+        return taken
+
+    def delay(self) -> float:
+        """Return the number of seconds until the next token is available."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+
+class ConflatingQueue:
+    """A queue of events that keeps only the latest event per type and id.
+
+    If an event with the same type and id as a queued event is appended,
+    it replaces the queued event, but keeps its position in the queue.
+    """
+
+    def __init__(self) -> None:
+        self._keys: deque[_EventKey] = deque()
+        self._events: dict[_EventKey, Event] = {}
+        self.conflated = 0
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[Event]:
+        return (self._events[k] for k in self._keys)
+
+    def append(self, event: Event) -> None:
+        key = (event.type, event.id)
+        if key in self._events:
+            self.conflated += 1
+        else:
+            self._keys.append(key)
+        self._events[key] = event
+
+    def popleft(self) -> Event:
+        return self._events.pop(self._keys.popleft())
+
+    def clear(self) -> None:
+        self._keys.clear()
+        self._events.clear()
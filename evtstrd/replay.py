@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import itertools
+import time
+
+from evtstrd.events import Notification
+
+# Orders notifications across all replay buffers.
+_order_counter = itertools.count()
+
+
+class _BufferedNotification:
+    def __init__(self, seq: int, notification: Notification) -> None:
+        self.seq = seq
+        self.order = next(_order_counter)
+        self.time = time.monotonic()
+        self.notification = notification
+
+
+class ReplayBuffer:
+    """A bounded ring buffer of the most recent notifications of a subsystem.
+
+    Notifications are kept until they are pushed out by newer ones, or
+    until they are older than max_age seconds. Each notification is
+    assigned a sequence number, and the buffer keeps an index from
+    notification ids to sequence numbers, so that the position of an id
+    in the ring can be looked up in constant time.
+
+    In addition, notifications are numbered in the order they were added
+    to any buffer, so that the notifications of several buffers can be
+    merged.
+    """
+
+    def __init__(self, depth: int, max_age: float) -> None:
+        if depth <= 0:
+            raise ValueError("depth must be positive")
+        self._depth = depth
+        self._max_age = max_age
+        self._ring: list[_BufferedNotification | None] = [None] * depth
+        self._positions: dict[str, int] = {}
+        self._start = 0  # sequence number of the oldest notification
+        self._next = 0  # sequence number of the next notification
+
+    def __len__(self) -> int:
+        return self._next - self._start
+
+    @property
+    def newest_time(self) -> float | None:
+        """The time the newest notification was added."""
+        if not self:
+            return None
+        newest = self._ring[(self._next - 1) % self._depth]
+        assert newest is not None
+        return newest.time
+
+    def append(self, notification: Notification) -> None:
+        if len(self) == self._depth:
+            self._pop_oldest()
+        seq = self._next
+        self._ring[seq % self._depth] = _BufferedNotification(
+            seq, notification
+        )
+        self._positions[notification.id] = seq
+        self._next += 1
+        self.expire()
+
+    def notifications_after(self, id: str) -> list[Notification] | None:
+        """Return all notifications that were added after the given id.
+
+        Return None if the id is not (or no longer) in the buffer.
+        """
+        order = self.order_of(id)
+        if order is None:
+            return None
+        return [n for _, n in self.entries_after(order)]
+
+    def order_of(self, id: str) -> int | None:
+        """Return the order number of the notification with the given id.
+
+        Return None if the id is not (or no longer) in the buffer.
+        """
+        self.expire()
+        seq = self._positions.get(id)
+        if seq is None:
+            return None
+        return self._entry(seq).order
+
+    def entries_after(self, order: int) -> list[tuple[int, Notification]]:
+        """Return all notifications with a higher order number.
+
+        The notifications are returned with their order numbers.
+        """
+        self.expire()
+        # Order numbers increase with the sequence numbers.
+        low, high = self._start, self._next
+        while low < high:
+            mid = (low + high) // 2
+            if self._entry(mid).order <= order:
+                low = mid + 1
+            else:
+                high = mid
+        return [
+            (entry.order, entry.notification)
+            for entry in map(self._entry, range(low, self._next))
+        ]
+
+    def expire(self) -> None:
+        """Remove all notifications that are older than max_age."""
+        limit = time.monotonic() - self._max_age
+        while self and self._entry(self._start).time < limit:
+            self._pop_oldest()
+
+    def _entry(self, seq: int) -> _BufferedNotification:
+        entry = self._ring[seq % self._depth]
+        assert entry is not None
+        return entry
+
+    def _pop_oldest(self) -> None:
+        entry = self._entry(self._start)
+        self._ring[self._start % self._depth] = None
+        # The id could have been reused by a newer notification.
+        if self._positions.get(entry.notification.id) == entry.seq:
+            del self._positions[entry.notification.id]
+        self._start += 1
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Generic, TypeVar
+
+_T = TypeVar("_T")
+
+SEPARATOR = "."
+# Matches exactly one segment of a subsystem name.
+SINGLE_WILDCARD = "*"
+# Matches any number of segments, including none.
+MULTI_WILDCARD = "#"
+
+
+def is_pattern(subsystem: str) -> bool:
+    """Return whether a subsystem name contains wildcard segments."""
+    return any(
+        s in (SINGLE_WILDCARD, MULTI_WILDCARD)
+        for s in subsystem.split(SEPARATOR)
+    )
+
+
+def subsystem_matches(pattern: str, subsystem: str) -> bool:
+    """Return whether a subsystem name matches a subscription pattern."""
+    return _segments_match(
+        pattern.split(SEPARATOR), subsystem.split(SEPARATOR)
+    )
+
+
+def _segments_match(pattern: list[str], segments: list[str]) -> bool:
+    if not pattern:
+        return not segments
+    head, rest = pattern[0], pattern[1:]
+    if head == MULTI_WILDCARD:
+        return any(
+            _segments_match(rest, segments[i:])
+            for i in range(len(segments) + 1)
+        )
+    if not segments:
+        return False
+    if head != SINGLE_WILDCARD and head != segments[0]:
+        return False
+    return _segments_match(rest, segments[1:])
+
+
+class _Node(Generic[_T]):
+    def __init__(self) -> None:
+        self.children: dict[str, _Node[_T]] = {}
+        self.pattern: str | None = None
+        self.value: _T | None = None
+
+
+class Router(Generic[_T]):
+    """Map subsystem patterns to values.
+
+    Subsystem names consist of segments separated by dots, for example
+    "orders.eu.berlin". In patterns, a "*" segment matches exactly one
+    segment, and a "#" segment matches any number of segments. Patterns
+    are stored in a trie of segments, so that finding all patterns that
+    match a subsystem name depends on the length of the name, not on the
+    number of patterns. Names without wildcards are looked up directly.
+    """
+
+    def __init__(self) -> None:
+        self._exact: dict[str, _T] = {}
+        self._root: _Node[_T] = _Node()
+        self._pattern_count = 0
+
+    def __len__(self) -> int:
+        return len(self._exact) + self._pattern_count
+
+    def __iter__(self) -> Iterator[str]:
+        return (pattern for pattern, _ in self.items())
+
+    def items(self) -> Iterator[tuple[str, _T]]:
+        yield from self._exact.items()
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.pattern is not None:
+                assert node.value is not None
+                yield node.pattern, node.value
+            stack.extend(node.children.values())
+
+    def get(self, pattern: str) -> _T | None:
+        if not is_pattern(pattern):
+            return self._exact.get(pattern)
+        node = self._root
+        for segment in pattern.split(SEPARATOR):
+            child = node.children.get(segment)
+            if child is None:
+                return None
+            node = child
+        return node.value
+
+    def set(self, pattern: str, value: _T) -> None:
+        if not is_pattern(pattern):
+            self._exact[pattern] = value
+            return
+        node = self._root
+        for segment in pattern.split(SEPARATOR):
+            node = node.children.setdefault(segment, _Node())
+        if node.pattern is None:
+            self._pattern_count += 1
+        node.pattern = pattern
+        node.value = value
+
+    def remove(self, pattern: str) -> None:
+        """Remove a pattern and prune the nodes that are no longer needed.
+
+        Removing a pattern that is not in the router is a no-op.
+        """
+        if not is_pattern(pattern):
+            self._exact.pop(pattern, None)
+            return
+        path = [self._root]
+        segments = pattern.split(SEPARATOR)
+        for segment in segments:
+            child = path[-1].children.get(segment)
+            if child is None:
+                return
+            path.append(child)
+        node = path[-1]
+        if node.pattern is None:
+            return
+        node.pattern = None
+        node.value = None
+        self._pattern_count -= 1
+        for parent, segment in zip(
+            reversed(path[:-1]), reversed(segments), strict=True
+        ):
+            child = parent.children[segment]
+            if child.children or child.pattern is not None:
+                break
+            del parent.children[segment]
+
+    def match(self, subsystem: str) -> list[_T]:
+        """Return the values of all patterns that match a subsystem name."""
+        exact = self._exact.get(subsystem)
+        if not self._pattern_count:
+            return [exact] if exact is not None else []
+        segments = subsystem.split(SEPARATOR)
+        matched: dict[int, _T] = {}
+        visited: set[tuple[int, int]] = set()
+        stack: list[tuple[_Node[_T], int]] = [(self._root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in visited:
+                continue
+            visited.add((id(node), i))
+            multi = node.children.get(MULTI_WILDCARD)
+            if multi is not None:
+                stack.extend((multi, j) for j in range(i, len(segments) + 1))
+            if i == len(segments):
+                if node.pattern is not None:
+                    assert node.value is not None
+                    matched[id(node)] = node.value
+                continue
+            child = node.children.get(segments[i])
+            if child is not None:
+                stack.append((child, i + 1))
+            single = node.children.get(SINGLE_WILDCARD)
+            if single is not None:
+                stack.append((single, i + 1))
+        values = list(matched.values())
+        if exact is not None:
+            values.append(exact)
+        return values
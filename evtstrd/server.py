@@ -2,13 +2,16 @@ from __future__ import annotations
 
 import asyncio
 import signal
-from asyncio import get_event_loop
+import socket
+from asyncio import FIRST_COMPLETED, get_event_loop
+from collections.abc import Sequence
 
 from evtstrd.config import Config
 from evtstrd.dispatcher import Dispatcher
 from evtstrd.http_server import HTTPServer
 from evtstrd.socket_server import SocketServer
 from evtstrd.stats import ServerStats
+from evtstrd.workers import WorkerChannel, WorkerProcess, WorkerRelay
 
 
 async def run_server(config: Config) -> None:
@@ -23,6 +26,51 @@ async def run_server(config: Config) -> None:
             dispatcher.disconnect_all()
 
 
+def run_worker(config: Config, sock: socket.socket) -> None:
+    asyncio.run(_serve_worker(config, sock))
+
+
+async def _serve_worker(config: Config, sock: socket.socket) -> None:
+    stop_event = asyncio.Event()
+    _setup_signal_handlers(stop_event)
+
+    stats = ServerStats()
+    dispatcher = Dispatcher(config, stats)
+    reader, writer = await asyncio.open_unix_connection(sock=sock)
+    channel = WorkerChannel(dispatcher, stats, writer)
+    channel_task = asyncio.create_task(channel.handle(reader, writer))
+    async with HTTPServer(config, dispatcher, stats, collector=channel):
+        # Stop when the connection to the master process is lost.
+        await asyncio.wait(
+            [asyncio.create_task(stop_event.wait()), channel_task],
+            return_when=FIRST_COMPLETED,
+        )
+        dispatcher.disconnect_all()
+    channel_task.cancel()
+    writer.close()
+
+
+async def run_master(config: Config, workers: Sequence[WorkerProcess]) -> None:
+    stop_event = asyncio.Event()
+    _setup_signal_handlers(stop_event)
+
+    relay = WorkerRelay(workers)
+    try:
+        async with relay, SocketServer(config, relay):
+            await asyncio.wait(
+                [
+                    asyncio.create_task(stop_event.wait()),
+                    asyncio.create_task(relay.wait_closed()),
+                ],
+                return_when=FIRST_COMPLETED,
+            )
+    finally:
+        for worker in workers:
+            worker.process.terminate()
+        for worker in workers:
+            await asyncio.to_thread(worker.process.join)
+
+
 def _setup_signal_handlers(stop_event: asyncio.Event) -> None:
     loop = get_event_loop()
     loop.add_signal_handler(signal.SIGINT, stop_event.set)
@@ -4,26 +4,33 @@ import logging
 import os
 from asyncio import (
     AbstractServer,
+    IncompleteReadError,
     StreamReader,
     StreamWriter,
     open_unix_connection,
     start_unix_server,
 )
-from collections.abc import Coroutine
+from collections.abc import Coroutine, Iterable, Sequence
 from grp import getgrnam
 from pwd import getpwnam
-from typing import Any
+from typing import Any, Protocol
 
-from jsonget import JsonValue, json_get
+from jsonget import JsonValue
 
 from evtstrd.config import Config
-from evtstrd.dispatcher import Dispatcher
+from evtstrd.events import Notification
 from evtstrd.exc import DisconnectedError, ServerAlreadyRunningError
-from evtstrd.util import read_json_line
+from evtstrd.framing import MAGIC, BinaryFrameReader
+from evtstrd.routing import is_pattern
+from evtstrd.util import JSONLineReader, get_field
+
+
+class SupportsNotify(Protocol):
+    def notify_all(self, notifications: Sequence[Notification]) -> int: ...
 
 
 class SocketServer:
-    def __init__(self, config: Config, dispatcher: Dispatcher) -> None:
+    def __init__(self, config: Config, dispatcher: SupportsNotify) -> None:
         self._config = config
         self._filename = config.socket_file
         self._socket_handler = SocketHandler(dispatcher)
@@ -76,37 +83,102 @@ class SocketServer:
 
 
 class SocketHandler:
-    def __init__(self, dispatcher: Dispatcher) -> None:
+    def __init__(self, dispatcher: SupportsNotify) -> None:
         self._dispatcher = dispatcher
 
     async def handle(self, reader: StreamReader, _: StreamWriter) -> None:
+        try:
+            first = await reader.readexactly(1)
+        except IncompleteReadError:
+            return
+        if first == MAGIC[:1]:
+            await self._handle_binary(reader)
+        else:
+            await self._handle_json(reader, first)
+
+    async def _handle_json(self, reader: StreamReader, initial: bytes) -> None:
+        lines = JSONLineReader(reader, initial_data=initial)
         while True:
             try:
-                message = await read_json_line(reader)
+                messages = await lines.read()
             except DisconnectedError:
                 break
-            action = json_get(message, "action", str)
-            if action == "notify":
-                self._notify_dispatcher(message)
-            else:
-                logging.warning(f"received unknown action '{action}'")
+            self.handle_messages(messages)
 
-    def _notify_dispatcher(self, message: JsonValue) -> None:
+    async def _handle_binary(self, reader: StreamReader) -> None:
         try:
-            subsystem, event, data, id = self._get_event_data(message)
-        except ValueError:
-            pass
+            magic = await reader.readexactly(len(MAGIC) - 1)
+        except IncompleteReadError:
+            return
+        if MAGIC[:1] + magic != MAGIC:
+            logging.error("unsupported binary framing, closing connection")
+            return
+        frames = BinaryFrameReader(reader)
+        while True:
+            try:
+                notifications = await frames.read()
+            except DisconnectedError:
+                break
+            if notifications:
+                self._dispatcher.notify_all(notifications)
+
+    def handle_messages(self, messages: Iterable[JsonValue]) -> None:
+        """Handle several messages in order.
+
+        The events of consecutive notify messages are passed to the
+        dispatcher together.
+        """
+        notifications: list[Notification] = []
+        for message in messages:
+            action = get_field(message, "action", str)
+            if action in ["notify", "notify-batch"]:
+                notifications.extend(self._get_notifications(message))
+            else:
+                if notifications:
+                    self._dispatcher.notify_all(notifications)
+                    notifications = []
+                self.handle_message(message)
+        if notifications:
+            self._dispatcher.notify_all(notifications)
+
+    def handle_message(self, message: JsonValue) -> None:
+        action = get_field(message, "action", str)
+        if action in ["notify", "notify-batch"]:
+            notifications = self._get_notifications(message)
+            if notifications:
+                self._dispatcher.notify_all(notifications)
+        else:
+            logging.warning(f"received unknown action '{action}'")
+
+    def _get_notifications(self, message: JsonValue) -> list[Notification]:
+        """Return the valid events of a notify or notify-batch message."""
+        if get_field(message, "action", str) == "notify":
+            events = [message]
         else:
-            self._dispatcher.notify(subsystem, event, data, id)
+            try:
+                events = get_field(message, "events", list)
+            except (ValueError, TypeError) as exc:
+                logging.error("received invalid JSON: " + str(exc))
+                return []
+        notifications = []
+        for event in events:
+            try:
+                notifications.append(self._get_notification(event))
+            except ValueError:
+                pass
+        return notifications
 
     @staticmethod
-    def _get_event_data(message: JsonValue) -> tuple[str, str, JsonValue, str]:
+    def _get_notification(message: JsonValue) -> Notification:
         try:
-            subsystem = json_get(message, "subsystem", str)
-            event = json_get(message, "event", str)
-            data = json_get(message, "data", dict)
-            id = json_get(message, "id", str)
+            subsystem = get_field(message, "subsystem", str)
+            event = get_field(message, "event", str)
+            data = get_field(message, "data", dict)
+            id = get_field(message, "id", str)
         except (ValueError, TypeError) as exc:
             logging.error("received invalid JSON: " + str(exc))
             raise ValueError(str(exc)) from exc
-        return subsystem, event, data, id
+        if is_pattern(subsystem):
+            logging.error(f"cannot notify subsystem pattern '{subsystem}'")
+            raise ValueError("subsystem pattern")
+        return Notification(subsystem, event, data, id)
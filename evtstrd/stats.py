@@ -1,17 +1,30 @@
 import datetime
-from collections.abc import Iterable
+import json
+from collections.abc import Iterable, Iterator, Sequence
 from typing import NotRequired, TypedDict
 
 from evtstrd.listener import Listener
+from evtstrd.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    LabeledCounter,
+    MetricsSnapshot,
+)
 
 JSONConnection = TypedDict(
     "JSONConnection",
     {
+        # The first subscription, for compatibility.
         "subsystem": str,
         "filters": list[str],
+        "subscriptions": dict[str, list[str]],
         "connection-time": str,
         "remote-host": str | None,
         "referer": NotRequired[str],
+        "queue-depth": int,
+        "dropped-events": int,
+        "bytes-written": int,
     },
 )
 
@@ -20,31 +33,333 @@ JSONStats = TypedDict(
     {
         "start-time": str,
         "total-connections": int,
+        "queued-events": int,
+        "dropped-events": int,
         "connections": list[JSONConnection],
+        "workers": NotRequired[int],
+    },
+)
+
+JSONSummary = TypedDict(
+    "JSONSummary",
+    {
+        "start-time": str,
+        "total-connections": int,
+        "active-connections": int,
+        "subsystems": dict[str, int],
+        "filters": dict[str, int],
+        "remote-hosts": dict[str, int],
+        "workers": NotRequired[int],
     },
 )
 
+# Listeners processed per piece of streamed statistics.
+STATS_BATCH_SIZE = 500
+
+FANOUT_BUCKETS = [0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1]
+AUTH_BUCKETS = [0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5]
+QUEUE_DEPTH_BUCKETS = [0, 1, 5, 10, 50, 100, 500, 1000]
+
+
+def _inc(counts: dict[str, int], key: str) -> None:
+    counts[key] = counts.get(key, 0) + 1
+
+
+def _dec(counts: dict[str, int], key: str) -> None:
+    if counts[key] <= 1:
+        del counts[key]
+    else:
+        counts[key] -= 1
+
+
+def _filter_strings(listener: Listener) -> list[str]:
+    """Return the distinct filters of all subscriptions of a listener."""
+    return list(
+        dict.fromkeys(
+            str(f)
+            for filters in listener.subscriptions.values()
+            for f in filters
+        )
+    )
+
+
+class ConnectionSummary:
+    """Counts of the active connections, updated as listeners come and go.
+
+    Listeners are counted per subsystem, per filter, and per remote host.
+    """
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.subsystems: dict[str, int] = {}
+        self.filters: dict[str, int] = {}
+        self.remote_hosts: dict[str, int] = {}
+
+    def add(self, listener: Listener) -> None:
+        self.active += 1
+        for subsystem in listener.subscriptions:
+            _inc(self.subsystems, subsystem)
+        for f in _filter_strings(listener):
+            _inc(self.filters, f)
+        if listener.remote_host is not None:
+            _inc(self.remote_hosts, listener.remote_host)
+
+    def remove(self, listener: Listener) -> None:
+        self.active -= 1
+        for subsystem in listener.subscriptions:
+            _dec(self.subsystems, subsystem)
+        for f in _filter_strings(listener):
+            _dec(self.filters, f)
+        if listener.remote_host is not None:
+            _dec(self.remote_hosts, listener.remote_host)
+
 
 class ServerStats:
     def __init__(self) -> None:
         self.start_time = datetime.datetime.now()
         self.total_connections = 0
+        self.connections = ConnectionSummary()
+        # Totals of listeners that have since disconnected.
+        self.dropped_events = 0
+        self.conflated_events = 0
+        self.bytes_written = 0
+        self.compression_bytes_in = 0
+        self.compression_bytes_out = 0
+        self.compression_duration = 0.0
+        self.events_received = LabeledCounter(
+            "eventstreamd_events_received_total",
+            "Events received from publishers.",
+            "subsystem",
+        )
+        self.events_delivered = Counter(
+            "eventstreamd_events_delivered_total",
+            "Events queued for delivery to listeners.",
+        )
+        self.coalesced_events = LabeledCounter(
+            "eventstreamd_events_coalesced_total",
+            "Events not sent, because they were replaced by a later event "
+            "with the same coalesce key.",
+            "subsystem",
+        )
+        self.filter_rejections = Counter(
+            "eventstreamd_filter_rejections_total",
+            "Events not delivered to a listener of their subsystem, "
+            "because the listener's filters did not match.",
+        )
+        self.fanout_duration = Histogram(
+            "eventstreamd_fanout_duration_seconds",
+            "Time spent notifying all listeners about an event.",
+            FANOUT_BUCKETS,
+        )
+        self.auth_duration = Histogram(
+            "eventstreamd_auth_duration_seconds",
+            "Time spent checking authorization.",
+            AUTH_BUCKETS,
+        )
+
+    def add_listener_totals(self, listener: Listener) -> None:
+        """Add the totals of a disconnected listener."""
+        self.dropped_events += listener.dropped_events
+        self.conflated_events += listener.conflated_events
+        self.bytes_written += listener.bytes_written
+        if listener.compressor is not None:
+            self.compression_bytes_in += listener.compressor.bytes_in
+            self.compression_bytes_out += listener.compressor.bytes_out
+            self.compression_duration += listener.compressor.duration
+
+
+def _json_connection(listener: Listener) -> JSONConnection:
+    subscriptions = {
+        subsystem: [str(f) for f in filters]
+        for subsystem, filters in listener.subscriptions.items()
+    }
+    subsystem, filters = next(iter(subscriptions.items()))
+    c: JSONConnection = {
+        "subsystem": subsystem,
+        "filters": filters,
+        "subscriptions": subscriptions,
+        "connection-time": listener.connection_time.isoformat(),
+        "remote-host": listener.remote_host,
+        "queue-depth": listener.queue_depth,
+        "dropped-events": listener.dropped_events,
+        "bytes-written": listener.bytes_written,
+    }
+    if listener.referer:
+        c["referer"] = listener.referer
+    return c
 
 
 def json_stats(stats: ServerStats, listeners: Iterable[Listener]) -> JSONStats:
-    def json_connection(listener: Listener) -> JSONConnection:
-        c: JSONConnection = {
-            "subsystem": listener.subsystem,
-            "filters": [str(f) for f in listener.filters],
-            "connection-time": listener.connection_time.isoformat(),
-            "remote-host": listener.remote_host,
-        }
-        if listener.referer:
-            c["referer"] = listener.referer
-        return c
+    connections = [_json_connection(li) for li in listeners]
+    return {
+        "start-time": stats.start_time.isoformat(),
+        "total-connections": stats.total_connections,
+        "queued-events": sum(c["queue-depth"] for c in connections),
+        "dropped-events": stats.dropped_events
+        + sum(c["dropped-events"] for c in connections),
+        "connections": connections,
+    }
+
+
+def iter_json_stats(
+    stats: ServerStats,
+    listeners: Sequence[Listener],
+    *,
+    offset: int = 0,
+    limit: int | None = None,
+    batch_size: int = STATS_BATCH_SIZE,
+) -> Iterator[str]:
+    """Serialize the statistics as JSON, piece by piece.
 
+    At most batch_size listeners are processed per piece, so that callers
+    can hand control back to the event loop between pieces. Pieces can be
+    empty. Only the connections from offset to offset + limit are
+    included, but the totals cover all listeners.
+    """
+    end = len(listeners) if limit is None else offset + limit
+    yield (
+        f'{{"start-time": {json.dumps(stats.start_time.isoformat())}, '
+        f'"total-connections": {stats.total_connections}, "connections": ['
+    )
+    queued = 0
+    dropped = stats.dropped_events
+    separator = ""
+    for start in range(0, len(listeners), batch_size):
+        batch = listeners[start : start + batch_size]
+        queued += sum(li.queue_depth for li in batch)
+        dropped += sum(li.dropped_events for li in batch)
+        page = listeners[max(start, offset) : min(start + batch_size, end)]
+        if page:
+            yield separator + ", ".join(
+                json.dumps(_json_connection(li)) for li in page
+            )
+            separator = ", "
+        else:
+            yield ""
+    yield f'], "queued-events": {queued}, "dropped-events": {dropped}}}'
+
+
+def json_summary(stats: ServerStats) -> JSONSummary:
     return {
         "start-time": stats.start_time.isoformat(),
         "total-connections": stats.total_connections,
-        "connections": [json_connection(li) for li in listeners],
+        "active-connections": stats.connections.active,
+        "subsystems": dict(stats.connections.subsystems),
+        "filters": dict(stats.connections.filters),
+        "remote-hosts": dict(stats.connections.remote_hosts),
     }
+
+
+def merge_stats(stats: Sequence[JSONStats]) -> JSONStats:
+    """Merge the statistics of several worker processes."""
+    return {
+        "start-time": min(s["start-time"] for s in stats),
+        "total-connections": sum(s["total-connections"] for s in stats),
+        "queued-events": sum(s["queued-events"] for s in stats),
+        "dropped-events": sum(s["dropped-events"] for s in stats),
+        "connections": [c for s in stats for c in s["connections"]],
+        "workers": len(stats),
+    }
+
+
+def _merge_counts(counts: Iterable[dict[str, int]]) -> dict[str, int]:
+    merged: dict[str, int] = {}
+    for c in counts:
+        for key, n in c.items():
+            merged[key] = merged.get(key, 0) + n
+    return merged
+
+
+def merge_summaries(summaries: Sequence[JSONSummary]) -> JSONSummary:
+    """Merge the connection summaries of several worker processes."""
+    return {
+        "start-time": min(s["start-time"] for s in summaries),
+        "total-connections": sum(s["total-connections"] for s in summaries),
+        "active-connections": sum(s["active-connections"] for s in summaries),
+        "subsystems": _merge_counts(s["subsystems"] for s in summaries),
+        "filters": _merge_counts(s["filters"] for s in summaries),
+        "remote-hosts": _merge_counts(s["remote-hosts"] for s in summaries),
+        "workers": len(summaries),
+    }
+
+
+def metrics_snapshot(
+    stats: ServerStats, listeners: Iterable[Listener]
+) -> MetricsSnapshot:
+    listeners = list(listeners)
+    snapshot: MetricsSnapshot = {}
+    Gauge(
+        "eventstreamd_active_connections",
+        "Currently connected listeners.",
+        len(listeners),
+    ).collect(snapshot)
+    connections = Counter(
+        "eventstreamd_connections_total",
+        "Listeners that connected since the server was started.",
+    )
+    connections.inc(stats.total_connections)
+    connections.collect(snapshot)
+    stats.events_received.collect(snapshot)
+    stats.events_delivered.collect(snapshot)
+    stats.coalesced_events.collect(snapshot)
+    stats.filter_rejections.collect(snapshot)
+    dropped = Counter(
+        "eventstreamd_dropped_events_total",
+        "Events dropped, because a listener's queue was full.",
+    )
+    dropped.inc(
+        stats.dropped_events + sum(li.dropped_events for li in listeners)
+    )
+    dropped.collect(snapshot)
+    conflated = Counter(
+        "eventstreamd_conflated_events_total",
+        "Events replaced by a later event with the same type and id, "
+        "because the listener's rate was limited.",
+    )
+    conflated.inc(
+        stats.conflated_events + sum(li.conflated_events for li in listeners)
+    )
+    conflated.collect(snapshot)
+    bytes_written = Counter(
+        "eventstreamd_bytes_written_total",
+        "Bytes written to listeners.",
+    )
+    bytes_written.inc(
+        stats.bytes_written + sum(li.bytes_written for li in listeners)
+    )
+    bytes_written.collect(snapshot)
+    compressors = [li.compressor for li in listeners if li.compressor]
+    compression_in = Counter(
+        "eventstreamd_compression_input_bytes_total",
+        "Bytes of event stream data passed to compressors.",
+    )
+    compression_in.inc(
+        stats.compression_bytes_in + sum(c.bytes_in for c in compressors)
+    )
+    compression_in.collect(snapshot)
+    compression_out = Counter(
+        "eventstreamd_compression_output_bytes_total",
+        "Compressed bytes of event stream data.",
+    )
+    compression_out.inc(
+        stats.compression_bytes_out + sum(c.bytes_out for c in compressors)
+    )
+    compression_out.collect(snapshot)
+    compression_duration = Counter(
+        "eventstreamd_compression_seconds_total",
+        "Time spent compressing event stream data.",
+    )
+    compression_duration.inc(
+        stats.compression_duration + sum(c.duration for c in compressors)
+    )
+    compression_duration.collect(snapshot)
+    stats.fanout_duration.collect(snapshot)
+    queue_depth = Histogram(
+        "eventstreamd_queue_depth",
+        "Events waiting to be written per listener.",
+        QUEUE_DEPTH_BUCKETS,
+    )
+    queue_depth.observe_all(li.queue_depth for li in listeners)
+    queue_depth.collect(snapshot)
+    stats.auth_duration.collect(snapshot)
+    return snapshot
@@ -1,33 +1,139 @@
-import asyncio
-import datetime
+import importlib
 import json
 import logging
 from asyncio.streams import StreamReader
-from typing import Any
+from collections.abc import Callable
+from typing import Any, TypeVar, cast
+
+from jsonget import JsonValue
 
 from evtstrd.exc import DisconnectedError
 
+_T = TypeVar("_T")
+
+# Bytes requested from the stream per read.
+READ_SIZE = 256 * 1024
+# Longer lines are discarded.
+MAX_LINE_SIZE = 16 * 1024 * 1024
+
+# Faster JSON parsers that are used if they are installed, in order of
+# preference.
+_JSON_BACKENDS = ["orjson", "ujson"]
+
+
+def _load_json_backend() -> tuple[str, Callable[[bytes], Any]]:
+    for name in _JSON_BACKENDS:
+        try:
+            module = importlib.import_module(name)
+        except ImportError:
+            continue
+        return name, cast(Callable[[bytes], Any], module.loads)
+    return "json", json.loads
+
+
+# The name of the module used to parse JSON, and its loads() function.
+# Invalid JSON raises a ValueError.
+json_backend, json_loads = _load_json_backend()
 
-async def read_json_line(reader: StreamReader) -> Any:
-    while True:
-        line = await reader.readline()
-        if line:
-            logging.debug(f"read line from socket: {line!r}")
-            try:
-                return json.loads(line.decode("utf-8").strip())
-            except (ValueError, UnicodeDecodeError):
-                logging.warning("invalid JSON received")
-        if reader.at_eof():
-            raise DisconnectedError()
 
+def get_field(message: JsonValue, name: str, expected_type: type[_T]) -> _T:
+    """Get a field of a JSON object and check its type.
 
-_RECHECK_SECONDS = 60  # in seconds
+    This is a faster alternative to json_get() for top-level fields. Raise
+    ValueError if the field is missing, and TypeError if message is not
+    an object or the field has the wrong type.
+    """
+    if not isinstance(message, dict):
+        raise TypeError("message is not a JSON object")
+    try:
+        value = message[name]
+    except KeyError:
+        raise ValueError(f"field '{name}' not found") from None
+    if not isinstance(value, expected_type):
+        raise TypeError(f"wrong JSON type of field '{name}'")
+    return value
 
 
-async def sleep_until(dt: datetime.datetime) -> None:
-    while True:
-        now = datetime.datetime.utcnow()
-        if now >= dt:
+class JSONLineReader:
+    """Read JSON messages from a stream, one message per line.
+
+    The stream is read in large chunks, and all complete lines of a
+    chunk are parsed at once. initial_data is treated as if it was read
+    from the stream first.
+    """
+
+    def __init__(
+        self,
+        reader: StreamReader,
+        *,
+        read_size: int = READ_SIZE,
+        max_line_size: int = MAX_LINE_SIZE,
+        initial_data: bytes = b"",
+    ) -> None:
+        self._reader = reader
+        self._read_size = read_size
+        self._max_line_size = max_line_size
+        # Data after the last line break.
+        self._partial: list[bytes] = []
+        self._partial_size = 0
+        self._discarding = False
+        self._add_partial(initial_data)
+
+    async def read(self) -> list[Any]:
+        """Read all messages that are available.
+
+        Wait until at least one line was received. Lines with invalid JSON
+        are skipped, so the returned list can be empty. Raise
+        DisconnectedError when the stream has ended.
+        """
+        while True:
+            data = await self._reader.read(self._read_size)
+            if not data:
+                line = self._take_partial()
+                if not line.strip():
+                    raise DisconnectedError()
+                return self._parse([line])
+            end = data.rfind(b"\n")
+            if end < 0:
+                self._add_partial(data)
+                continue
+            lines = data[:end].split(b"\n")
+            if self._discarding:
+                # The rest of an overlong line.
+                lines[0] = b""
+            lines[0] = self._take_partial() + lines[0]
+            self._add_partial(data[end + 1 :])
+            return self._parse(lines)
+
+    def _add_partial(self, data: bytes) -> None:
+        if self._discarding or not data:
             return
-        remaining = (dt - now).total_seconds()
-        await asyncio.sleep(min(remaining, _RECHECK_SECONDS))
+        self._partial.append(data)
+        self._partial_size += len(data)
+        if self._partial_size > self._max_line_size:
+            logging.warning("discarding overlong line")
+            self._partial.clear()
+            self._partial_size = 0
+            self._discarding = True
+
+    def _take_partial(self) -> bytes:
+        """Return the start of the current line and reset the buffer."""
+        partial = b"".join(self._partial)
+        self._partial.clear()
+        self._partial_size = 0
+        self._discarding = False
+        return partial
+
+    def _parse(self, lines: list[bytes]) -> list[Any]:
+        if logging.root.isEnabledFor(logging.DEBUG):
+            for line in lines:
+                logging.debug(f"read line from socket: {line!r}")
+        messages = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                messages.append(json_loads(line))
+            except ValueError:
+                logging.warning("invalid JSON received")
+        return messages
@@ -0,0 +1,360 @@
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import socket
+from asyncio import FIRST_COMPLETED, StreamReader, StreamWriter
+from collections.abc import Callable, Coroutine, Sequence
+from multiprocessing.process import BaseProcess
+from typing import Any, TypeAlias, cast
+
+from jsonget import JsonValue, json_get
+
+from evtstrd.config import Config
+from evtstrd.dispatcher import Dispatcher
+from evtstrd.events import Notification
+from evtstrd.exc import DisconnectedError
+from evtstrd.metrics import MetricsSnapshot, merge_metrics
+from evtstrd.socket_server import SocketHandler
+from evtstrd.stats import (
+    JSONStats,
+    JSONSummary,
+    ServerStats,
+    json_stats,
+    json_summary,
+    merge_stats,
+    merge_summaries,
+    metrics_snapshot,
+)
+from evtstrd.util import JSONLineReader
+
+STATS_TIMEOUT = 5  # in seconds
+
+WorkerMain = Callable[[Config, socket.socket], None]
+
+# A statistics, summary, or metrics report, depending on the requested kind.
+_Report: TypeAlias = JSONStats | JSONSummary | MetricsSnapshot | dict[str, Any]
+
+
+def _write_message(writer: StreamWriter, message: dict[str, object]) -> None:
+    writer.write(json.dumps(message).encode("utf-8") + b"\n")
+
+
+class WorkerProcess:
+    def __init__(
+        self, index: int, process: BaseProcess, sock: socket.socket
+    ) -> None:
+        self.index = index
+        self.process = process
+        self.socket = sock
+
+
+def start_workers(config: Config, main: WorkerMain) -> list[WorkerProcess]:
+    """Fork the worker processes.
+
+    Each worker process is connected to the master process using a socket
+    pair, and calls main with its end of the pair. This must be called
+    before an event loop is started in the master process.
+    """
+    ctx = multiprocessing.get_context("fork")
+    workers: list[WorkerProcess] = []
+    for index in range(config.workers):
+        master_sock, worker_sock = socket.socketpair()
+        # The worker must not keep the master's end of any socket pair
+        # open, otherwise the master would not notice when it exits.
+        inherited = [w.socket for w in workers] + [master_sock]
+        process = ctx.Process(
+            target=_run_worker,
+            args=(main, config, worker_sock, inherited),
+            name=f"eventstreamd-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        worker_sock.close()
+        workers.append(WorkerProcess(index, process, master_sock))
+    return workers
+
+
+def _run_worker(
+    main: WorkerMain,
+    config: Config,
+    sock: socket.socket,
+    inherited: list[socket.socket],
+) -> None:
+    for s in inherited:
+        s.close()
+    main(config, sock)
+
+
+class WorkerRelay:
+    """Relay events from the master process to all worker processes.
+
+    The relay is used as dispatcher by the master process's socket server.
+    It also collects the statistics of all workers when a worker requests
+    them.
+    """
+
+    def __init__(self, workers: Sequence[WorkerProcess]) -> None:
+        self._workers = workers
+        self._connections: list[_WorkerConnection] = []
+        self._read_tasks: list[asyncio.Task[None]] = []
+        self._background_tasks: set[asyncio.Task[None]] = set()
+
+    async def __aenter__(self) -> None:
+        for worker in self._workers:
+            reader, writer = await asyncio.open_unix_connection(
+                sock=worker.socket
+            )
+            connection = _WorkerConnection(worker.index, reader, writer, self)
+            self._connections.append(connection)
+            self._read_tasks.append(asyncio.create_task(connection.read()))
+
+    async def __aexit__(self, *_: object) -> None:
+        for task in self._read_tasks:
+            task.cancel()
+        for connection in self._connections:
+            connection.close()
+
+    async def wait_closed(self) -> None:
+        """Wait until the connection to any worker was lost."""
+        await asyncio.wait(self._read_tasks, return_when=FIRST_COMPLETED)
+
+    def notify_all(self, notifications: Sequence[Notification]) -> int:
+        """Forward notifications to all workers.
+
+        Since listeners are only known to the workers, this always
+        returns 0.
+        """
+        if not notifications:
+            return 0
+        message = {
+            "action": "notify-batch",
+            "events": [
+                {
+                    "subsystem": n.subsystem,
+                    "event": n.type,
+                    "data": n.data,
+                    "id": n.id,
+                }
+                for n in notifications
+            ],
+        }
+        line = json.dumps(message).encode("utf-8") + b"\n"
+        for connection in self._connections:
+            connection.write(line)
+        return 0
+
+    def run_in_background(self, coro: Coroutine[Any, Any, None]) -> None:
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+
+    async def collect_stats(self) -> list[JSONStats]:
+        """Request the statistics of all workers.
+
+        Workers that do not respond in time are left out.
+        """
+        return cast(list[JSONStats], await self._collect("stats"))
+
+    async def collect_metrics(self) -> list[MetricsSnapshot]:
+        """Request the metrics of all workers.
+
+        Workers that do not respond in time are left out.
+        """
+        return cast(list[MetricsSnapshot], await self._collect("metrics"))
+
+    async def collect_summaries(self) -> list[JSONSummary]:
+        """Request the connection summaries of all workers.
+
+        Workers that do not respond in time are left out.
+        """
+        return cast(list[JSONSummary], await self._collect("summary"))
+
+    async def _collect(self, kind: str) -> list[_Report]:
+        tasks = [
+            asyncio.ensure_future(c.request_stats(kind))
+            for c in self._connections
+        ]
+        await asyncio.wait(tasks, timeout=STATS_TIMEOUT)
+        reports = []
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif task.exception() is None:
+                reports.append(task.result())
+        return reports
+
+
+class _WorkerConnection:
+    """The master process's connection to a worker process."""
+
+    def __init__(
+        self,
+        index: int,
+        reader: StreamReader,
+        writer: StreamWriter,
+        relay: WorkerRelay,
+    ) -> None:
+        self._index = index
+        self._reader = reader
+        self._writer = writer
+        self._relay = relay
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future[_Report]] = {}
+
+    def write(self, data: bytes) -> None:
+        self._writer.write(data)
+
+    def close(self) -> None:
+        self._writer.close()
+
+    async def request_stats(self, kind: str = "stats") -> _Report:
+        id = next(self._ids)
+        future: asyncio.Future[_Report] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[id] = future
+        try:
+            _write_message(
+                self._writer,
+                {"action": "stats-request", "id": id, "kind": kind},
+            )
+            return await future
+        finally:
+            del self._pending[id]
+
+    async def read(self) -> None:
+        lines = JSONLineReader(self._reader)
+        while True:
+            try:
+                messages = await lines.read()
+            except DisconnectedError:
+                logging.error(f"lost connection to worker {self._index}")
+                return
+            for message in messages:
+                self._handle_message(message)
+
+    def _handle_message(self, message: JsonValue) -> None:
+        try:
+            action = json_get(message, "action", str)
+            id = json_get(message, "id", int)
+        except (ValueError, TypeError) as exc:
+            logging.error(f"invalid message from worker: {exc}")
+            return
+        if action == "stats":
+            future = self._pending.get(id)
+            if future is not None and not future.done():
+                stats = json_get(message, "stats", dict)
+                future.set_result(stats)
+        elif action == "collect-stats":
+            kind = _message_kind(message)
+            self._relay.run_in_background(self._send_collected_stats(id, kind))
+        else:
+            logging.warning(f"received unknown action '{action}'")
+
+    async def _send_collected_stats(self, id: int, kind: str) -> None:
+        merged: _Report
+        if kind == "metrics":
+            merged = merge_metrics(await self._relay.collect_metrics())
+        elif kind == "summary":
+            merged = merge_summaries(await self._relay.collect_summaries())
+        else:
+            merged = merge_stats(await self._relay.collect_stats())
+        _write_message(
+            self._writer, {"action": "stats", "id": id, "stats": merged}
+        )
+
+
+class WorkerChannel(SocketHandler):
+    """A worker process's connection to the master process.
+
+    Events are received like on the publisher socket. In addition, the
+    worker answers statistics requests from the master, and can request
+    the statistics of all workers.
+    """
+
+    def __init__(
+        self, dispatcher: Dispatcher, stats: ServerStats, writer: StreamWriter
+    ) -> None:
+        super().__init__(dispatcher)
+        self._local_dispatcher = dispatcher
+        self._stats = stats
+        self._writer = writer
+        self._ids = itertools.count()
+        self._pending: dict[int, asyncio.Future[_Report]] = {}
+
+    def handle_message(self, message: JsonValue) -> None:
+        action = json_get(message, "action", str)
+        if action == "stats-request":
+            id = json_get(message, "id", int)
+            stats = self._local_report(_message_kind(message))
+            _write_message(
+                self._writer, {"action": "stats", "id": id, "stats": stats}
+            )
+        elif action == "stats":
+            future = self._pending.get(json_get(message, "id", int))
+            if future is not None and not future.done():
+                future.set_result(json_get(message, "stats", dict))
+        else:
+            super().handle_message(message)
+
+    async def collect_stats(self) -> JSONStats:
+        """Return the merged statistics of all workers.
+
+        If the master process does not respond in time, only this worker's
+        statistics are returned.
+        """
+        return cast(JSONStats, await self._collect("stats"))
+
+    async def collect_metrics(self) -> MetricsSnapshot:
+        """Return the merged metrics of all workers.
+
+        If the master process does not respond in time, only this worker's
+        metrics are returned.
+        """
+        return cast(MetricsSnapshot, await self._collect("metrics"))
+
+    async def collect_summary(self) -> JSONSummary:
+        """Return the merged connection summaries of all workers.
+
+        If the master process does not respond in time, only this worker's
+        summary is returned.
+        """
+        return cast(JSONSummary, await self._collect("summary"))
+
+    async def _collect(self, kind: str) -> _Report:
+        id = next(self._ids)
+        future: asyncio.Future[_Report] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._pending[id] = future
+        try:
+            _write_message(
+                self._writer,
+                {"action": "collect-stats", "id": id, "kind": kind},
+            )
+            async with asyncio.timeout(2 * STATS_TIMEOUT):
+                return await future
+        except TimeoutError:
+            logging.warning(f"timeout while collecting worker {kind}")
+            return self._local_report(kind)
+        finally:
+            del self._pending[id]
+
+    def _local_report(self, kind: str) -> _Report:
+        if kind == "summary":
+            return json_summary(self._stats)
+        listeners = self._local_dispatcher.all_listeners
+        if kind == "metrics":
+            return metrics_snapshot(self._stats, listeners)
+        return json_stats(self._stats, listeners)
+
+
+def _message_kind(message: JsonValue) -> str:
+    try:
+        return json_get(message, "kind", str)
+    except (ValueError, TypeError):
+        return "stats"
@@ -0,0 +1,109 @@
+import asyncio
+import datetime
+from collections.abc import Mapping
+from typing import Any
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal, assert_is_none, assert_raises
+
+from evtstrd.auth import Authorizer
+from evtstrd.http import HTTPError
+
+
+class _FakePlugin:
+    def __init__(self, response: Mapping[str, Any]) -> None:
+        self.response = response
+        self.calls = 0
+
+    async def __call__(
+        self, route: str, headers: Mapping[str, str], **kwargs: Any
+    ) -> Mapping[str, Any]:
+        self.calls += 1
+        await asyncio.sleep(0)
+        return self.response
+
+
+def _authorizer(plugin: _FakePlugin, cache_size: int = 10) -> Authorizer:
+    return Authorizer(
+        plugin,
+        cache_ttl=60,
+        cache_size=cache_size,
+        cache_headers=["authorization"],
+    )
+
+
+class AuthorizerTest(IsolatedAsyncioTestCase):
+    async def test_no_plugin(self) -> None:
+        expire, data = await Authorizer(None).check("events", {})
+        assert_is_none(expire)
+        assert_is_none(data)
+
+    async def test_ok(self) -> None:
+        plugin = _FakePlugin({"status": "ok", "data": "foo"})
+        _, data = await Authorizer(plugin).check("events", {})
+        assert_equal("foo", data)
+
+    async def test_forbidden(self) -> None:
+        plugin = _FakePlugin({"status": "forbidden"})
+        with assert_raises(HTTPError):
+            await Authorizer(plugin).check("events", {})
+
+    async def test_no_cache_by_default(self) -> None:
+        plugin = _FakePlugin({"status": "ok"})
+        authorizer = Authorizer(plugin)
+        await authorizer.check("events", {})
+        await authorizer.check("events", {})
+        assert_equal(2, plugin.calls)
+
+    async def test_cache(self) -> None:
+        plugin = _FakePlugin({"status": "ok"})
+        authorizer = _authorizer(plugin)
+        await authorizer.check("events", {"authorization": "a"}, subsystem="s")
+        await authorizer.check("events", {"authorization": "a"}, subsystem="s")
+        assert_equal(1, plugin.calls)
+        await authorizer.check("events", {"authorization": "b"}, subsystem="s")
+        await authorizer.check("events", {"authorization": "a"}, subsystem="t")
+        await authorizer.check("stats", {"authorization": "a"})
+        assert_equal(4, plugin.calls)
+
+    async def test_do_not_cache_denials(self) -> None:
+        plugin = _FakePlugin({"status": "forbidden"})
+        authorizer = _authorizer(plugin)
+        for _ in range(2):
+            with assert_raises(HTTPError):
+                await authorizer.check("events", {})
+        assert_equal(2, plugin.calls)
+
+    async def test_do_not_cache_beyond_expire(self) -> None:
+        expire = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+            seconds=1
+        )
+        plugin = _FakePlugin({"status": "ok", "expire": expire})
+        authorizer = _authorizer(plugin)
+        await authorizer.check("events", {})
+        await authorizer.check("events", {})
+        assert_equal(2, plugin.calls)
+
+    async def test_evict_least_recently_used(self) -> None:
+        plugin = _FakePlugin({"status": "ok"})
+        authorizer = _authorizer(plugin, cache_size=2)
+        await authorizer.check("events", {"authorization": "a"})
+        await authorizer.check("events", {"authorization": "b"})
+        await authorizer.check("events", {"authorization": "a"})
+        await authorizer.check("events", {"authorization": "c"})
+        assert_equal(3, plugin.calls)
+        await authorizer.check("events", {"authorization": "a"})
+        assert_equal(3, plugin.calls)
+        await authorizer.check("events", {"authorization": "b"})
+        assert_equal(4, plugin.calls)
+
+    async def test_coalesce_concurrent_checks(self) -> None:
+        plugin = _FakePlugin({"status": "ok"})
+        authorizer = _authorizer(plugin)
+        await asyncio.gather(
+            *[
+                authorizer.check("events", {"authorization": "a"})
+                for _ in range(100)
+            ]
+        )
+        assert_equal(1, plugin.calls)
@@ -0,0 +1,65 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from asserts import assert_equal, assert_false, assert_is_none, assert_true
+
+from evtstrd.coalesce import Coalescer, CoalesceRule
+from evtstrd.events import Notification
+from evtstrd.metrics import LabeledCounter
+
+
+def _notification(
+    data: dict[str, object], event_type: str = "update"
+) -> Notification:
+    return Notification("sub", event_type, data, "id")
+
+
+class CoalesceRuleTest(TestCase):
+    def test_key_value(self) -> None:
+        rule = CoalesceRule("record.id", 1)
+        assert_equal(12, rule.key_value(_notification({"record": {"id": 12}})))
+
+    def test_key_value__not_coalescable(self) -> None:
+        rule = CoalesceRule("record.id", 1)
+        assert_is_none(rule.key_value(_notification({})))
+        assert_is_none(rule.key_value(_notification({"record": 12})))
+        assert_is_none(rule.key_value(_notification({"record": {"id": None}})))
+        assert_is_none(rule.key_value(_notification({"record": {"id": [1]}})))
+
+
+class CoalescerTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.dispatched: list[Notification] = []
+        self.saved = LabeledCounter("saved", "", "subsystem")
+        self.coalescer = Coalescer(
+            {"sub": CoalesceRule("id", 0.01)},
+            self.dispatched.append,
+            self.saved,
+        )
+
+    async def test_collapse_to_latest(self) -> None:
+        n1 = _notification({"id": 1, "v": 1})
+        n2 = _notification({"id": 1, "v": 2})
+        n3 = _notification({"id": 2, "v": 3})
+        n4 = _notification({"id": 1, "v": 4}, "delete")
+        for n in [n1, n2, n3, n4]:
+            assert_true(self.coalescer.hold(n))
+        assert_equal([], self.dispatched)
+        await asyncio.sleep(0.02)
+        assert_equal([n2, n3, n4], self.dispatched)
+        assert_equal({"sub": 1}, self.saved.values)
+
+    async def test_new_window_after_flush(self) -> None:
+        n1 = _notification({"id": 1})
+        n2 = _notification({"id": 1})
+        self.coalescer.hold(n1)
+        await asyncio.sleep(0.02)
+        self.coalescer.hold(n2)
+        await asyncio.sleep(0.02)
+        assert_equal([n1, n2], self.dispatched)
+        assert_equal({}, self.saved.values)
+
+    async def test_pass_through(self) -> None:
+        assert_false(self.coalescer.hold(_notification({})))
+        other = Notification("other", "update", {"id": 1}, "id")
+        assert_false(self.coalescer.hold(other))
@@ -0,0 +1,45 @@
+import gzip
+import zlib
+from unittest import TestCase
+
+from asserts import assert_equal, assert_is_none
+
+from evtstrd.compression import StreamCompressor, negotiate_encoding
+
+
+class NegotiateEncodingTest(TestCase):
+    def test_no_header(self) -> None:
+        assert_is_none(negotiate_encoding(None))
+        assert_is_none(negotiate_encoding(""))
+
+    def test_unsupported(self) -> None:
+        assert_is_none(negotiate_encoding("br, identity"))
+
+    def test_prefer_gzip(self) -> None:
+        assert_equal("gzip", negotiate_encoding("deflate, gzip, br"))
+
+    def test_quality(self) -> None:
+        assert_equal("deflate", negotiate_encoding("gzip;q=0.5, deflate"))
+        assert_equal("deflate", negotiate_encoding("gzip; q=0, deflate"))
+        assert_is_none(negotiate_encoding("gzip;q=0"))
+
+    def test_wildcard(self) -> None:
+        assert_equal("gzip", negotiate_encoding("*"))
+        assert_equal("deflate", negotiate_encoding("gzip;q=0, *"))
+
+
+class StreamCompressorTest(TestCase):
+    def test_flush_after_compress(self) -> None:
+        compressor = StreamCompressor("deflate", 6, 8)
+        decompressor = zlib.decompressobj()
+        first = compressor.compress([b"foo", b"bar"])
+        assert_equal(b"foobar", decompressor.decompress(first))
+        second = compressor.compress([b"baz"])
+        assert_equal(b"baz", decompressor.decompress(second))
+        assert_equal(9, compressor.bytes_in)
+        assert_equal(len(first) + len(second), compressor.bytes_out)
+
+    def test_gzip(self) -> None:
+        compressor = StreamCompressor("gzip", 6, 8)
+        data = compressor.compress([b"foo"]) + compressor.finish()
+        assert_equal(b"foo", gzip.decompress(data))
@@ -0,0 +1,242 @@
+import asyncio
+import re
+from typing import cast
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from asserts import assert_equal, assert_false, assert_is
+
+import evtstrd.events
+from evtstrd.coalesce import CoalesceRule
+from evtstrd.config import Config
+from evtstrd.dispatcher import Dispatcher
+from evtstrd.events import Notification
+from evtstrd.filters import parse_filter
+from evtstrd.listener import Listener
+from evtstrd.stats import ServerStats
+from evtstrd_test.fakes import FakeWriter, fake_streams
+
+
+async def _flush(listener: Listener) -> FakeWriter:
+    listener.close()
+    await listener.write_loop()
+    return cast(FakeWriter, listener.writer)
+
+
+class DispatcherNotifyTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.dispatcher = Dispatcher(Config(), ServerStats())
+
+    def _add_listener(self, subsystem: str, *filters: str) -> Listener:
+        reader, writer = fake_streams()
+        return self.dispatcher._setup_listener(
+            reader,
+            writer,
+            None,
+            {subsystem: [parse_filter(f) for f in filters]},
+        )
+
+    async def test_write_frame(self) -> None:
+        listener = self._add_listener("sub")
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "id1")
+        writer = await _flush(listener)
+        payload = b'event: add\r\ndata: {"foo": 1}\r\nid: id1\r\n\r\n'
+        assert_equal(b"%x\r\n%b\r\n" % (len(payload), payload), writer.data)
+
+    async def test_serialize_once(self) -> None:
+        listeners = [self._add_listener("sub") for _ in range(3)]
+        filtered = self._add_listener("sub", "foo=2")
+        other = self._add_listener("other")
+        with patch.object(
+            evtstrd.events.json, "dumps", wraps=evtstrd.events.json.dumps
+        ) as dumps:
+            self.dispatcher.notify("sub", "add", {"foo": 1}, "id1")
+            writers = [await _flush(li) for li in listeners]
+        assert_equal(1, dumps.call_count)
+        assert_equal(1, len(writers[0].written))
+        for w in writers[1:]:
+            assert_is(writers[0].written[0], w.written[0])
+        assert_equal([], (await _flush(filtered)).written)
+        assert_equal([], (await _flush(other)).written)
+
+    async def test_notify_all(self) -> None:
+        l1 = self._add_listener("sub")
+        l2 = self._add_listener("other", "foo=2")
+        notified = self.dispatcher.notify_all(
+            [
+                Notification("sub", "add", {"foo": 1}, "a"),
+                Notification("other", "add", {"foo": 1}, "b"),
+                Notification("other", "add", {"foo": 2}, "c"),
+                Notification("sub", "add", {"foo": 2}, "d"),
+            ]
+        )
+        assert_equal(3, notified)
+        w1 = await _flush(l1)
+        w2 = await _flush(l2)
+        assert_equal([b"a", b"d"], re.findall(rb"id: (\w+)", w1.data))
+        assert_equal([b"c"], re.findall(rb"id: (\w+)", w2.data))
+        # The burst is written in a single batch.
+        assert_equal(1, w1.write_count)
+
+    async def test_no_matching_listener__no_serialization(self) -> None:
+        self._add_listener("sub", "foo=2")
+        with patch.object(evtstrd.events.json, "dumps") as dumps:
+            self.dispatcher.notify("sub", "add", {"foo": 1}, "id1")
+        dumps.assert_not_called()
+
+    async def test_multiple_subsystems(self) -> None:
+        reader, writer = fake_streams()
+        listener = self.dispatcher._setup_listener(
+            reader,
+            writer,
+            None,
+            {"sub": [parse_filter("foo=1")], "other": []},
+        )
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        self.dispatcher.notify("sub", "add", {"foo": 2}, "b")
+        self.dispatcher.notify("other", "add", {"foo": 2}, "c")
+        self.dispatcher.notify("third", "add", {"foo": 1}, "d")
+        w = await _flush(listener)
+        assert_equal([b"a", b"c"], re.findall(rb"id: (\w+)", w.data))
+        assert_equal([], list(self.dispatcher._listeners))
+
+    async def test_coalesce(self) -> None:
+        self.dispatcher._config.coalesce["sub"] = CoalesceRule("rec", 0.01)
+        listener = self._add_listener("sub")
+        self.dispatcher.notify("sub", "add", {"rec": 1}, "a")
+        self.dispatcher.notify("sub", "add", {"rec": 1}, "b")
+        self.dispatcher.notify("sub", "add", {}, "c")
+        await asyncio.sleep(0.02)
+        w = await _flush(listener)
+        assert_equal([b"c", b"b"], re.findall(rb"id: (\w+)", w.data))
+        assert_equal(
+            {"sub": 1}, self.dispatcher._stats.coalesced_events.values
+        )
+
+    async def test_serialized_data(self) -> None:
+        unfiltered = self._add_listener("sub")
+        n1 = Notification.from_json("sub", "add", b'{"foo": 1}', "a")
+        self.dispatcher.notify_all([n1])
+        assert_false("data" in n1.__dict__)
+        filtered = self._add_listener("sub", "foo=2")
+        n2 = Notification.from_json("sub", "add", b'{"foo": 2}', "b")
+        self.dispatcher.notify_all([n2])
+        w = await _flush(unfiltered)
+        assert_equal(
+            [b'{"foo": 1}', b'{"foo": 2}'],
+            re.findall(rb"data: (.*)\r", w.data),
+        )
+        w = await _flush(filtered)
+        assert_equal([b"b"], re.findall(rb"id: (\w+)", w.data))
+
+    async def test_wildcards(self) -> None:
+        reader, writer = fake_streams()
+        listener = self.dispatcher._setup_listener(
+            reader,
+            writer,
+            None,
+            {"orders.*": [], "orders.eu.#": [parse_filter("foo=1")]},
+        )
+        self.dispatcher.notify("orders.eu", "add", {"foo": 2}, "a")
+        self.dispatcher.notify("orders.eu.berlin", "add", {"foo": 1}, "b")
+        self.dispatcher.notify("orders.eu.berlin", "add", {"foo": 2}, "c")
+        self.dispatcher.notify("orders.us.boston", "add", {"foo": 1}, "d")
+        self.dispatcher.notify("orders", "add", {"foo": 1}, "e")
+        w = await _flush(listener)
+        assert_equal([b"a", b"b"], re.findall(rb"id: (\w+)", w.data))
+
+
+class DispatcherRegistryTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.dispatcher = Dispatcher(Config(), ServerStats())
+
+    def _add_listener(self, subsystem: str) -> Listener:
+        reader, writer = fake_streams()
+        return self.dispatcher._setup_listener(
+            reader, writer, None, {subsystem: []}
+        )
+
+    def test_all_listeners__snapshot(self) -> None:
+        l1 = self._add_listener("sub")
+        l2 = self._add_listener("other")
+        snapshot = self.dispatcher.all_listeners
+        l3 = self._add_listener("sub")
+        l1.close()
+        assert_equal((l1, l2), tuple(snapshot))
+        assert_equal((l2, l3), tuple(self.dispatcher.all_listeners))
+
+    def test_remove_empty_subsystems(self) -> None:
+        listener = self._add_listener("sub")
+        listener.close()
+        self.dispatcher.notify("unknown", "add", {}, "id1")
+        assert_equal([], list(self.dispatcher._listeners))
+
+
+class DispatcherReplayTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        config = Config()
+        config.queue_size = 2
+        self.dispatcher = Dispatcher(config, ServerStats())
+
+    def _add_listener(self, last_event_id: str, *filters: str) -> Listener:
+        reader, writer = fake_streams()
+        listener = self.dispatcher._setup_listener(
+            reader, writer, None, {"sub": [parse_filter(f) for f in filters]}
+        )
+        self.dispatcher._replay(listener, last_event_id)
+        return listener
+
+    async def _received_ids(self, listener: Listener) -> list[bytes]:
+        writer = await _flush(listener)
+        return re.findall(rb"id: (\w+)", writer.data)
+
+    async def test_replay(self) -> None:
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        self.dispatcher.notify("sub", "add", {"foo": 2}, "b")
+        self.dispatcher.notify("other", "add", {"foo": 2}, "c")
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "d")
+        listener = self._add_listener("a")
+        assert_equal([b"b", b"d"], await self._received_ids(listener))
+
+    async def test_replay_through_filters(self) -> None:
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        self.dispatcher.notify("sub", "add", {"foo": 2}, "b")
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "c")
+        listener = self._add_listener("a", "foo=1")
+        assert_equal([b"c"], await self._received_ids(listener))
+
+    async def test_replay_multiple_subsystems(self) -> None:
+        self.dispatcher._config.queue_size = 10
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        self.dispatcher.notify("other", "add", {"foo": 1}, "b")
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "c")
+        self.dispatcher.notify("third", "add", {"foo": 1}, "d")
+        self.dispatcher.notify("other", "add", {"foo": 2}, "e")
+        self.dispatcher.notify("other", "add", {"foo": 1}, "f")
+        reader, writer = fake_streams()
+        listener = self.dispatcher._setup_listener(
+            reader,
+            writer,
+            None,
+            {"sub": [], "other": [parse_filter("foo=1")]},
+        )
+        self.dispatcher._replay(listener, "b")
+        assert_equal([b"c", b"f"], await self._received_ids(listener))
+
+    async def test_replay_at_most_queue_size(self) -> None:
+        for id in "abcd":
+            self.dispatcher.notify("sub", "add", {"foo": 1}, id)
+        listener = self._add_listener("a")
+        assert_equal([b"c", b"d"], await self._received_ids(listener))
+
+    async def test_unknown_id(self) -> None:
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        listener = self._add_listener("x")
+        assert_equal([], await self._received_ids(listener))
+
+    async def test_replay_disabled(self) -> None:
+        self.dispatcher._config.replay_depth = 0
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "a")
+        self.dispatcher.notify("sub", "add", {"foo": 1}, "b")
+        listener = self._add_listener("a")
+        assert_equal([], await self._received_ids(listener))
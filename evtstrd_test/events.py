@@ -2,7 +2,7 @@ from unittest import TestCase
 
 from asserts import assert_equal
 
-from evtstrd.events import Event, JSONEvent
+from evtstrd.events import Event, JSONEvent, Notification
 
 
 class EventTest(TestCase):
@@ -15,3 +15,26 @@ class EventTest(TestCase):
 class JSONEventTest(TestCase):
     def test_exercise(self) -> None:
         JSONEvent("add", {})
+
+
+class NotificationTest(TestCase):
+    def test_event(self) -> None:
+        notification = Notification("sub", "add", {"foo": 1}, "a")
+        assert_equal(
+            b'event: add\r\ndata: {"foo": 1}\r\nid: a\r\n\r\n',
+            notification.event.payload,
+        )
+
+    def test_from_json(self) -> None:
+        notification = Notification.from_json(
+            "sub", "add", b'{"foo":\r\n  1}', "a"
+        )
+        assert_equal(
+            b'event: add\r\ndata: {"foo":    1}\r\nid: a\r\n\r\n',
+            notification.event.payload,
+        )
+        assert_equal({"foo": 1}, notification.data)
+
+    def test_from_json__invalid(self) -> None:
+        notification = Notification.from_json("sub", "add", b"{", "a")
+        assert_equal(None, notification.data)
@@ -0,0 +1,90 @@
+import asyncio
+import datetime
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal, assert_false, assert_true
+
+from evtstrd.config import Config
+from evtstrd.expiry import ExpiryScheduler
+from evtstrd.listener import Listener
+from evtstrd_test.fakes import fake_streams
+
+_NOW = datetime.datetime(2026, 4, 13, 12, 0)
+
+
+def _listener() -> Listener:
+    reader, writer = fake_streams()
+    return Listener(Config(), reader, writer, {"sub": []})
+
+
+def _at(seconds: float) -> datetime.datetime:
+    return _NOW + datetime.timedelta(seconds=seconds)
+
+
+class ExpirySchedulerTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.expired: list[Listener] = []
+        self.scheduler = ExpiryScheduler(self.expired.append)
+
+    def tearDown(self) -> None:
+        if self.scheduler._task is not None:
+            self.scheduler._task.cancel()
+
+    async def test_expire_in_order(self) -> None:
+        l1, l2, l3 = _listener(), _listener(), _listener()
+        self.scheduler.add(l1, _at(20))
+        self.scheduler.add(l2, _at(10))
+        self.scheduler.add(l3, _at(30))
+        assert_equal([], self.scheduler.expire(_at(5)))
+        assert_equal([l2, l1], self.scheduler.expire(_at(25)))
+        assert_equal([l2, l1], self.expired)
+        assert_equal(1, len(self.scheduler))
+
+    async def test_bulk_expiry(self) -> None:
+        listeners = [_listener() for _ in range(100)]
+        for listener in listeners:
+            self.scheduler.add(listener, _at(10))
+        assert_equal(listeners, self.scheduler.expire(_at(10)))
+        assert_equal(0, len(self.scheduler))
+
+    async def test_remove(self) -> None:
+        l1, l2 = _listener(), _listener()
+        self.scheduler.add(l1, _at(10))
+        self.scheduler.add(l2, _at(10))
+        self.scheduler.remove(l1)
+        self.scheduler.remove(l1)
+        assert_equal([l2], self.scheduler.expire(_at(10)))
+
+    async def test_readd(self) -> None:
+        listener = _listener()
+        self.scheduler.add(listener, _at(10))
+        self.scheduler.add(listener, _at(20))
+        assert_equal([], self.scheduler.expire(_at(15)))
+        assert_equal([listener], self.scheduler.expire(_at(20)))
+
+    async def test_timezone_aware(self) -> None:
+        listener = _listener()
+        tz = datetime.timezone(datetime.timedelta(hours=2))
+        self.scheduler.add(
+            listener, datetime.datetime(2026, 4, 13, 14, 0, 10, tzinfo=tz)
+        )
+        assert_equal([], self.scheduler.expire(_at(5)))
+        assert_equal([listener], self.scheduler.expire(_at(10)))
+
+    async def test_run(self) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        l1, l2 = _listener(), _listener()
+        self.scheduler.add(l1, now + datetime.timedelta(seconds=60))
+        assert_true(self.scheduler._task)
+        self.scheduler.add(l2, now + datetime.timedelta(milliseconds=10))
+        await asyncio.sleep(0.05)
+        assert_equal([l2], self.expired)
+        self.scheduler.remove(l1)
+        assert_false(self.scheduler._task)
+
+    async def test_task_ends_when_empty(self) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        self.scheduler.add(_listener(), now)
+        await asyncio.sleep(0.01)
+        assert_equal(1, len(self.expired))
+        assert_false(self.scheduler._task)
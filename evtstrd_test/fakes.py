@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from asyncio import StreamReader, StreamWriter
+from collections.abc import Iterable
+from typing import Any, cast
+
+
+class FakeReader:
+    def __init__(self) -> None:
+        self.eof = False
+
+    def at_eof(self) -> bool:
+        return self.eof
+
+
+class FakeWriter:
+    def __init__(self) -> None:
+        self.written: list[bytes] = []
+        self.write_count = 0
+        self.closed = False
+
+    @property
+    def data(self) -> bytes:
+        return b"".join(self.written)
+
+    def write(self, data: bytes) -> None:
+        self.written.append(data)
+        self.write_count += 1
+
+    def writelines(self, data: Iterable[bytes]) -> None:
+        self.written.extend(data)
+        self.write_count += 1
+
+    async def drain(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        if name == "peername":
+            return ("127.0.0.1", 12345)
+        return default
+
+
+def fake_streams() -> tuple[StreamReader, StreamWriter]:
+    return cast(StreamReader, FakeReader()), cast(StreamWriter, FakeWriter())
@@ -1,8 +1,10 @@
 from unittest import TestCase
+from unittest.mock import patch
 
 from asserts import assert_equal, assert_false, assert_raises, assert_true
 
-from evtstrd.filters import parse_filter
+import evtstrd.filters
+from evtstrd.filters import FieldValues, parse_filter
 
 
 class FilterTest(TestCase):
@@ -36,6 +38,34 @@ class FilterTest(TestCase):
         assert_false(filter_({"foo": {"bar": "ABC"}}))
         assert_true(filter_({"foo": {"bar": "CAA"}}))
 
+    def test_get_value__invalid(self) -> None:
+        filter_ = parse_filter("foo.bar<='ABC'")
+        with assert_raises(ValueError):
+            filter_.get_value({"foo": "bar"})
+
+    def test_memoize_values(self) -> None:
+        f1 = parse_filter("foo>=2016-01-01")
+        f2 = parse_filter("foo<2017-01-01")
+        other = parse_filter("bar=2016-03-24")
+        message = {"foo": "2016-03-24", "bar": "2016-03-24"}
+        values: FieldValues = {}
+        with patch.object(
+            evtstrd.filters,
+            "parse_iso_date",
+            wraps=evtstrd.filters.parse_iso_date,
+        ) as parse_iso_date:
+            assert_true(f1(message, values))
+            assert_true(f2(message, values))
+            assert_true(other(message, values))
+        assert_equal(2, parse_iso_date.call_count)
+
+    def test_memoize_invalid_values(self) -> None:
+        f1 = parse_filter("foo>=2016-01-01")
+        f2 = parse_filter("foo<2017-01-01")
+        values: FieldValues = {}
+        assert_false(f1({"foo": "invalid"}, values))
+        assert_false(f2({"foo": "2016-03-24"}, values))
+
 
 class ParseFilterTest(TestCase):
     def test_invalid_filter(self) -> None:
@@ -91,3 +121,32 @@ class ParseFilterTest(TestCase):
     def test_nested_value(self) -> None:
         f = parse_filter("foo.bar<=10")
         assert_true(f({"foo": {"bar": 10}}))
+
+    def test_membership(self) -> None:
+        f = parse_filter("foo~in(1,2,3)")
+        assert_equal(frozenset({1, 2, 3}), f.value)
+        assert_true(f({"foo": 2}))
+        assert_false(f({"foo": 4}))
+        assert_false(f({"foo": "2"}))
+
+    def test_membership_strings_and_dates(self) -> None:
+        f = parse_filter("foo~in('a,b','c')")
+        assert_true(f({"foo": "a,b"}))
+        assert_false(f({"foo": "a"}))
+        f = parse_filter("foo~in(2016-03-24,2017-01-01)")
+        assert_true(f({"foo": "2016-03-24"}))
+        assert_false(f({"foo": "2016-03-25"}))
+
+    def test_invalid_membership(self) -> None:
+        for string in ["foo~in()", "foo~in(1,'a')", "foo~in(1,2", "foo~in1"]:
+            with assert_raises(ValueError):
+                parse_filter(string)
+
+    def test_prefix(self) -> None:
+        f = parse_filter("foo^='ab'")
+        assert_true(f({"foo": "abc"}))
+        assert_true(f({"foo": "ab"}))
+        assert_false(f({"foo": "a"}))
+        assert_false(f({"foo": 12}))
+        with assert_raises(ValueError):
+            parse_filter("foo^=12")
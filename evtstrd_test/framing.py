@@ -0,0 +1,61 @@
+from asyncio import StreamReader
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal, assert_raises
+
+from evtstrd.events import Notification
+from evtstrd.exc import DisconnectedError
+from evtstrd.framing import BinaryFrameReader, encode_frame
+
+
+def _fields(notifications: list[Notification]) -> list[tuple[str, ...]]:
+    return [(n.subsystem, n.type, n.id) for n in notifications]
+
+
+class BinaryFrameReaderTest(IsolatedAsyncioTestCase):
+    async def test_read_all_frames(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(
+            encode_frame("sub", "add", "a", b'{"foo": 1}')
+            + encode_frame("süb", "remove", "", b"{}")
+        )
+        reader.feed_eof()
+        frames = BinaryFrameReader(reader)
+        notifications = await frames.read()
+        assert_equal(
+            [("sub", "add", "a"), ("süb", "remove", "")],
+            _fields(notifications),
+        )
+        assert_equal({"foo": 1}, notifications[0].data)
+        with assert_raises(DisconnectedError):
+            await frames.read()
+
+    async def test_partial_frames(self) -> None:
+        reader = StreamReader()
+        frame = encode_frame("sub", "add", "a", b'{"foo": 1}')
+        reader.feed_data(frame + frame[:5])
+        reader.feed_data(frame[5:])
+        frames = BinaryFrameReader(reader, read_size=len(frame) + 3)
+        assert_equal([("sub", "add", "a")], _fields(await frames.read()))
+        assert_equal([("sub", "add", "a")], _fields(await frames.read()))
+
+    async def test_skip_invalid_frames(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(
+            encode_frame("sub.*", "add", "a", b"{}")
+            + b"\x00\x01\x00\x00\x00\x00\x00\x00\x00\x00\xff"
+            + encode_frame("sub", "add", "b", b"{}")
+        )
+        frames = BinaryFrameReader(reader)
+        assert_equal([("sub", "add", "b")], _fields(await frames.read()))
+
+    async def test_discard_overlong_frames(self) -> None:
+        reader = StreamReader()
+        frame = encode_frame("sub", "add", "a", b"[" + b" " * 98 + b"]")
+        reader.feed_data(frame[:60])
+        reader.feed_data(frame[60:] + encode_frame("sub", "add", "b", b"{}"))
+        frames = BinaryFrameReader(reader, read_size=50, max_frame_size=100)
+        notifications = []
+        while not notifications:
+            notifications = await frames.read()
+        assert_equal([("sub", "add", "b")], _fields(notifications))
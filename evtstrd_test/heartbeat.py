@@ -0,0 +1,78 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import patch
+
+from asserts import assert_equal, assert_false, assert_true
+
+from evtstrd.config import Config
+from evtstrd.events import Comment
+from evtstrd.heartbeat import HeartbeatScheduler
+from evtstrd.listener import Listener
+from evtstrd_test.fakes import fake_streams
+
+
+def _listener() -> Listener:
+    reader, writer = fake_streams()
+    return Listener(Config(), reader, writer, {"sub": []})
+
+
+class CommentTest(IsolatedAsyncioTestCase):
+    async def test_bytes(self) -> None:
+        assert_equal(b":\n\n", bytes(Comment()))
+        assert_equal(b":foo\n\n", bytes(Comment("foo")))
+
+
+class HeartbeatSchedulerTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.now = 1000.0
+        patcher = patch("evtstrd.heartbeat.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.scheduler = HeartbeatScheduler(20, Comment(), bucket_count=2)
+        self.listeners: list[Listener] = []
+
+    def tearDown(self) -> None:
+        for listener in self.listeners:
+            self.scheduler.remove(listener)
+
+    def _add(self, id: int) -> Listener:
+        listener = _listener()
+        listener.id = id
+        listener.last_write = self.now
+        self.scheduler.add(listener)
+        self.listeners.append(listener)
+        return listener
+
+    async def test_initial_heartbeat(self) -> None:
+        listener = self._add(1)
+        assert_equal(1, listener.queue_depth)
+
+    async def test_sweep_buckets_in_turn(self) -> None:
+        even = self._add(2)
+        odd = self._add(3)
+        self.now += 20
+        assert_equal(1, self.scheduler.sweep())
+        assert_equal(2, even.queue_depth)
+        assert_equal(1, odd.queue_depth)
+        assert_equal(1, self.scheduler.sweep())
+        assert_equal(2, odd.queue_depth)
+
+    async def test_skip_active_listeners(self) -> None:
+        active = self._add(2)
+        idle = self._add(4)
+        self.now += 20
+        active.last_write = self.now - 5
+        assert_equal(1, self.scheduler.sweep())
+        assert_equal(1, active.queue_depth)
+        assert_equal(2, idle.queue_depth)
+
+    async def test_task_runs_only_with_listeners(self) -> None:
+        assert_false(self.scheduler._task)
+        listener = self._add(1)
+        assert_true(self.scheduler._task)
+        assert_equal(1, len(self.scheduler))
+        self.scheduler.remove(listener)
+        self.scheduler.remove(listener)
+        assert_equal(0, len(self.scheduler))
+        assert_false(self.scheduler._task)
+        await asyncio.sleep(0)
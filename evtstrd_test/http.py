@@ -0,0 +1,130 @@
+import asyncio
+import logging
+from http import HTTPStatus
+from typing import Any, cast
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from asserts import assert_equal
+
+from evtstrd.http import (
+    HTTPError,
+    encode_chunk,
+    read_http_head,
+    write_chunk,
+    write_last_chunk,
+)
+from evtstrd_test.fakes import FakeWriter, fake_streams
+
+
+class ChunkTest(TestCase):
+    def test_encode_chunk(self) -> None:
+        assert_equal(b"3\r\nabc\r\n", encode_chunk(b"abc"))
+        assert_equal(b"1a\r\n" + b"x" * 26 + b"\r\n", encode_chunk(b"x" * 26))
+
+    def test_write_chunk__single_write(self) -> None:
+        _, writer = fake_streams()
+        write_chunk(writer, b"abc")
+        assert_equal([b"3\r\nabc\r\n"], cast(FakeWriter, writer).written)
+
+    def test_write_last_chunk(self) -> None:
+        _, writer = fake_streams()
+        write_last_chunk(writer)
+        assert_equal([b"0\r\n\r\n"], cast(FakeWriter, writer).written)
+
+    def test_write_chunk__no_debug_formatting(self) -> None:
+        _, writer = fake_streams()
+        with patch("evtstrd.http.logging.debug") as debug:
+            write_chunk(writer, b"abc")
+        debug.assert_not_called()
+
+    def test_write_chunk__debug_log(self) -> None:
+        _, writer = fake_streams()
+        with self.assertLogs(level=logging.DEBUG) as logs:
+            write_chunk(writer, b"a\r\nb")
+        assert_equal(
+            ["DEBUG:root:wrote chunk to listener: 4\\r\\na\\r\\nb\\r\\n"],
+            logs.output,
+        )
+
+
+def _reader(data: bytes, *, eof: bool = True) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    if eof:
+        reader.feed_eof()
+    return reader
+
+
+class ReadHTTPHeadTest(IsolatedAsyncioTestCase):
+    async def _assert_status(
+        self, status: HTTPStatus, reader: asyncio.StreamReader, **kwargs: Any
+    ) -> None:
+        try:
+            await read_http_head(reader, **kwargs)
+        except HTTPError as exc:
+            assert_equal(status, exc.status)
+        else:
+            raise AssertionError("HTTPError not raised")
+
+    async def test_read(self) -> None:
+        reader = _reader(
+            b"GET /events?x=1 HTTP/1.1\r\n"
+            b"Host: localhost\r\n"
+            b"X-Empty:\r\n"
+            b"Authorization:  Bearer foo \r\n"
+            b"\r\n"
+            b"body"
+        )
+        method, path, headers = await read_http_head(reader)
+        assert_equal("GET", method)
+        assert_equal("/events?x=1", path)
+        assert_equal(
+            {
+                "host": "localhost",
+                "x-empty": "",
+                "authorization": "Bearer foo",
+            },
+            headers,
+        )
+        assert_equal(b"body", await reader.read())
+
+    async def test_invalid_request_line(self) -> None:
+        reader = _reader(b"GET /events\r\n\r\n")
+        await self._assert_status(HTTPStatus.BAD_REQUEST, reader)
+
+    async def test_unsupported_method(self) -> None:
+        reader = _reader(b"PATCH / HTTP/1.1\r\n\r\n")
+        await self._assert_status(HTTPStatus.NOT_IMPLEMENTED, reader)
+
+    async def test_invalid_header_line(self) -> None:
+        reader = _reader(b"GET / HTTP/1.1\r\nInvalid\r\n\r\n")
+        await self._assert_status(HTTPStatus.BAD_REQUEST, reader)
+
+    async def test_non_ascii(self) -> None:
+        reader = _reader(b"GET / HTTP/1.1\r\nX-Foo: \xe4\r\n\r\n")
+        await self._assert_status(HTTPStatus.BAD_REQUEST, reader)
+
+    async def test_incomplete(self) -> None:
+        reader = _reader(b"GET / HTTP/1.1\r\nHost: localhost\r\n")
+        await self._assert_status(HTTPStatus.BAD_REQUEST, reader)
+
+    async def test_too_large(self) -> None:
+        reader = _reader(
+            b"GET / HTTP/1.1\r\nX-Foo: " + b"x" * 100 + b"\r\n\r\n"
+        )
+        await self._assert_status(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, reader, max_size=100
+        )
+
+    async def test_too_many_headers(self) -> None:
+        reader = _reader(b"GET / HTTP/1.1\r\n" + b"X-Foo: x\r\n" * 3 + b"\r\n")
+        await self._assert_status(
+            HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, reader, max_headers=2
+        )
+
+    async def test_timeout(self) -> None:
+        reader = _reader(b"GET / HTTP/1.1\r\n", eof=False)
+        await self._assert_status(
+            HTTPStatus.REQUEST_TIMEOUT, reader, timeout=0.01
+        )
@@ -0,0 +1,136 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from asserts import assert_count_equal, assert_equal
+
+from evtstrd.config import Config
+from evtstrd.filters import Filter, StringFilter, parse_filter
+from evtstrd.index import FilterIndex
+from evtstrd.listener import Listener
+from evtstrd_test.fakes import fake_streams
+
+
+def _listener(*filters: str) -> Listener:
+    reader, writer = fake_streams()
+    return Listener(
+        Config(), reader, writer, {"sub": [parse_filter(f) for f in filters]}
+    )
+
+
+class FilterTest(TestCase):
+    def test_equal_filters(self) -> None:
+        assert_equal(parse_filter("foo.bar=1"), parse_filter("foo.bar=1"))
+        assert_equal(
+            hash(parse_filter("foo.bar=1")), hash(parse_filter("foo.bar=1"))
+        )
+
+    def test_different_filters(self) -> None:
+        assert_equal(2, len({parse_filter("foo=1"), parse_filter("foo='1'")}))
+        assert_equal(2, len({parse_filter("foo=1"), parse_filter("foo<=1")}))
+        assert_equal(2, len({parse_filter("foo=1"), parse_filter("bar=1")}))
+
+
+class FilterIndexTest(TestCase):
+    def setUp(self) -> None:
+        self.index = FilterIndex()
+
+    def _add(self, *filters: str) -> Listener:
+        listener = _listener(*filters)
+        self.index.add(listener, listener.subscriptions["sub"])
+        return listener
+
+    def test_no_filters(self) -> None:
+        listener = self._add()
+        assert_equal([listener], self.index.match({}))
+
+    def test_match(self) -> None:
+        l1 = self._add("foo=1")
+        l2 = self._add("foo=2")
+        l3 = self._add("foo=1", "bar>5")
+        l4 = self._add("bar>5")
+        self._add("bar<5")
+        assert_count_equal(
+            [l1, l3, l4], self.index.match({"foo": 1, "bar": 6})
+        )
+        assert_count_equal([l2], self.index.match({"foo": 2, "bar": 5}))
+        assert_count_equal([], self.index.match({"foo": "1", "bar": 5}))
+
+    def test_group_listeners_with_same_filters(self) -> None:
+        l1 = self._add("foo=1", "bar>5")
+        l2 = self._add("bar>5", "foo=1")
+        assert_equal(2, len(self.index))
+        assert_equal(1, self.index.group_count)
+        assert_count_equal([l1, l2], self.index.match({"foo": 1, "bar": 6}))
+
+    def test_evaluate_each_filter_once(self) -> None:
+        for _ in range(10):
+            self._add("bar>5")
+            self._add("baz<3", "bar>5")
+        with patch.object(
+            StringFilter,
+            "__call__",
+            autospec=True,
+            side_effect=Filter.__call__,
+        ) as call:
+            self.index.match({"bar": 6, "baz": 2})
+        assert_equal(2, call.call_count)
+
+    def test_equality_index_skips_other_values(self) -> None:
+        for i in range(10):
+            self._add(f"foo={i}", "bar>5")
+        with patch.object(
+            StringFilter,
+            "__call__",
+            autospec=True,
+            side_effect=Filter.__call__,
+        ) as call:
+            self.index.match({"foo": 3, "bar": 6})
+        evaluated = {str(c.args[0]) for c in call.call_args_list}
+        assert_equal({"foo=3", "bar>5"}, evaluated)
+
+    def test_membership_index(self) -> None:
+        l1 = self._add("foo~in(1,2,3)")
+        l2 = self._add("foo~in(3,4)", "bar>5")
+        l3 = self._add("foo=3")
+        for i in range(10, 20):
+            self._add(f"foo~in({i},{i + 100})")
+        with patch.object(
+            StringFilter,
+            "__call__",
+            autospec=True,
+            side_effect=Filter.__call__,
+        ) as call:
+            matched = self.index.match({"foo": 3, "bar": 6})
+        assert_count_equal([l1, l2, l3], matched)
+        evaluated = {str(c.args[0]) for c in call.call_args_list}
+        assert_equal(
+            {"foo~in(1,2,3)", "foo~in(3,4)", "bar>5", "foo=3"}, evaluated
+        )
+        assert_equal([l1], self.index.match({"foo": 2}))
+
+    def test_remove_membership(self) -> None:
+        l1 = self._add("foo~in(1,2)")
+        l2 = self._add("foo~in(2,3)")
+        self.index.remove(l1)
+        assert_equal([], self.index.match({"foo": 1}))
+        assert_equal([l2], self.index.match({"foo": 2}))
+        self.index.remove(l2)
+        assert_equal({}, self.index._equality_indexes)
+
+    def test_date_equality(self) -> None:
+        listener = self._add("foo=2016-03-24")
+        assert_equal([], self.index.match({"foo": "2016-03-23"}))
+        assert_equal([listener], self.index.match({"foo": "20160324"}))
+
+    def test_remove(self) -> None:
+        l1 = self._add("foo=1")
+        l2 = self._add("foo=1")
+        self.index.remove(l1)
+        assert_equal([l2], self.index.match({"foo": 1}))
+        self.index.remove(l2)
+        assert_equal(0, len(self.index))
+        assert_equal(0, self.index.group_count)
+        assert_equal([], self.index.match({"foo": 1}))
+
+    def test_remove_unknown(self) -> None:
+        self.index.remove(_listener())
@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+from typing import cast
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal, assert_false, assert_true
+
+from evtstrd.compression import StreamCompressor
+from evtstrd.config import Config
+from evtstrd.events import Event
+from evtstrd.listener import Listener
+from evtstrd_test.fakes import FakeReader, FakeWriter, fake_streams
+
+
+def _listener(queue_size: int = 3, policy: str = "drop-oldest") -> Listener:
+    config = Config()
+    config.queue_size = queue_size
+    config.slow_consumer_policy = policy
+    reader, writer = fake_streams()
+    return Listener(config, reader, writer, {"sub": []})
+
+
+def _event(n: int) -> Event:
+    return Event("test", str(n))
+
+
+def _written_data(listener: Listener) -> list[str]:
+    writer = cast(FakeWriter, listener.writer)
+    return [
+        line.split(b": ", 1)[1].decode()
+        for chunk in writer.written
+        for line in chunk.split(b"\r\n")
+        if line.startswith(b"data: ")
+    ]
+
+
+class ListenerQueueTest(IsolatedAsyncioTestCase):
+    async def test_write_queued_events(self) -> None:
+        listener = _listener()
+        listener.send(_event(1))
+        listener.send(_event(2))
+        assert_equal(2, listener.queue_depth)
+        listener.close()
+        await listener.write_loop()
+        assert_equal(["1", "2"], _written_data(listener))
+        assert_equal(0, listener.queue_depth)
+
+    async def test_write_in_batches(self) -> None:
+        listener = _listener()
+        task = asyncio.create_task(listener.write_loop())
+        listener.send(_event(1))
+        listener.send(_event(2))
+        await asyncio.sleep(0)
+        listener.send(_event(3))
+        listener.close()
+        await task
+        assert_equal(["1", "2", "3"], _written_data(listener))
+
+    async def test_drop_oldest(self) -> None:
+        listener = _listener(policy="drop-oldest")
+        for i in range(5):
+            listener.send(_event(i))
+        assert_equal(3, listener.queue_depth)
+        assert_equal(2, listener.dropped_events)
+        listener.close()
+        await listener.write_loop()
+        assert_equal(["2", "3", "4"], _written_data(listener))
+
+    async def test_drop_newest(self) -> None:
+        listener = _listener(policy="drop-newest")
+        for i in range(5):
+            listener.send(_event(i))
+        assert_equal(2, listener.dropped_events)
+        listener.close()
+        await listener.write_loop()
+        assert_equal(["0", "1", "2"], _written_data(listener))
+
+    async def test_disconnect(self) -> None:
+        closed: list[Listener] = []
+        listener = _listener(policy="disconnect")
+        listener.on_close = closed.append
+        for i in range(5):
+            listener.send(_event(i))
+        assert_true(listener.closing)
+        assert_equal([listener], closed)
+        assert_equal(4, listener.dropped_events)
+        await listener.write_loop()
+        assert_equal(['{"reason": "overflow"}'], _written_data(listener))
+
+    async def test_send_after_eof(self) -> None:
+        listener = _listener()
+        cast(FakeReader, listener.reader).eof = True
+        listener.send(_event(1))
+        assert_true(listener.closing)
+        assert_equal(0, listener.queue_depth)
+
+    async def test_close_twice(self) -> None:
+        closed: list[Listener] = []
+        listener = _listener()
+        listener.on_close = closed.append
+        listener.close()
+        listener.close()
+        assert_equal([listener], closed)
+        assert_false(listener.queue_depth)
+
+    async def test_compress(self) -> None:
+        listener = _listener()
+        listener.compressor = StreamCompressor("gzip", 6, 8)
+        listener.send(_event(1))
+        listener.send(_event(2))
+        listener.close()
+        await listener.write_loop()
+        listener.disconnect()
+        writer = cast(FakeWriter, listener.writer)
+        # One chunk for both events, one for the end of the stream, and
+        # the last chunk.
+        assert_equal(3, len(writer.written))
+        chunks = []
+        for chunk in writer.written:
+            size, data = chunk.split(b"\r\n", 1)
+            assert_equal(int(size, 16), len(data) - 2)
+            chunks.append(data[:-2])
+        assert_equal(
+            _event(1).payload + _event(2).payload,
+            gzip.decompress(b"".join(chunks)),
+        )
+
+
+class ListenerRateLimitTest(IsolatedAsyncioTestCase):
+    async def test_limit_rate(self) -> None:
+        listener = _listener(queue_size=100)
+        listener.limit_rate(2)
+        for i in range(5):
+            listener.send(Event("test", str(i), str(i)))
+        task = asyncio.create_task(listener.write_loop())
+        await asyncio.sleep(0)
+        assert_equal(["0", "1"], _written_data(listener))
+        assert_equal(3, listener.queue_depth)
+        # The remaining events are written when the listener is closed.
+        listener.close()
+        await task
+        assert_equal(["0", "1", "2", "3", "4"], _written_data(listener))
+
+    async def test_limit_rate__wake_up(self) -> None:
+        listener = _listener(queue_size=100)
+        listener.limit_rate(50)
+        task = asyncio.create_task(listener.write_loop())
+        for i in range(51):
+            listener.send(Event("test", str(i), str(i)))
+        await asyncio.sleep(0)
+        assert_equal(1, listener.queue_depth)
+        await asyncio.sleep(0.05)
+        assert_equal(0, listener.queue_depth)
+        listener.close()
+        await task
+
+    async def test_conflate(self) -> None:
+        listener = _listener()
+        listener.limit_rate(1)
+        task = asyncio.create_task(listener.write_loop())
+        listener.send(Event("test", "a1", "a"))
+        await asyncio.sleep(0)
+        for data, id in [("b1", "b"), ("c1", "c"), ("b2", "b"), ("b3", "b")]:
+            listener.send(Event("test", data, id))
+        assert_equal(2, listener.queue_depth)
+        assert_equal(2, listener.conflated_events)
+        listener.close()
+        await task
+        assert_equal(["a1", "b3", "c1"], _written_data(listener))
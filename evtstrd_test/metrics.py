@@ -0,0 +1,66 @@
+from unittest import TestCase
+
+from asserts import assert_equal
+
+from evtstrd.metrics import (
+    Counter,
+    Histogram,
+    LabeledCounter,
+    MetricsSnapshot,
+    merge_metrics,
+    render_metrics,
+)
+
+
+class HistogramTest(TestCase):
+    def test_collect(self) -> None:
+        histogram = Histogram("latency", "Latency.", [0.1, 1])
+        histogram.observe_all([0.05, 0.1, 0.5, 3])
+        snapshot: MetricsSnapshot = {}
+        histogram.collect(snapshot)
+        assert_equal(
+            {
+                'latency_bucket{le="0.1"}': 2,
+                'latency_bucket{le="1"}': 3,
+                'latency_bucket{le="+Inf"}': 4,
+                "latency_sum": 3.65,
+                "latency_count": 4,
+            },
+            snapshot["latency"]["samples"],
+        )
+
+
+class MergeMetricsTest(TestCase):
+    def test_merge(self) -> None:
+        counter = LabeledCounter("events", "Events.", "subsystem")
+        counter.inc("foo", 2)
+        first: MetricsSnapshot = {}
+        counter.collect(first)
+        counter.inc("bar")
+        second: MetricsSnapshot = {}
+        counter.collect(second)
+        merged = merge_metrics([first, second])
+        assert_equal(
+            {'events{subsystem="foo"}': 4, 'events{subsystem="bar"}': 1},
+            merged["events"]["samples"],
+        )
+
+
+class RenderMetricsTest(TestCase):
+    def test_render(self) -> None:
+        counter = Counter("connections_total", "Total connections.")
+        counter.inc(3)
+        labeled = LabeledCounter("events", "Events.", "subsystem")
+        labeled.inc('a"b')
+        snapshot: MetricsSnapshot = {}
+        counter.collect(snapshot)
+        labeled.collect(snapshot)
+        assert_equal(
+            "# HELP connections_total Total connections.\n"
+            "# TYPE connections_total counter\n"
+            "connections_total 3\n"
+            "# HELP events Events.\n"
+            "# TYPE events counter\n"
+            'events{subsystem="a\\"b"} 1\n',
+            render_metrics(snapshot),
+        )
@@ -0,0 +1,37 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from asserts import assert_almost_equal, assert_equal
+
+from evtstrd.events import Event
+from evtstrd.ratelimit import ConflatingQueue, TokenBucket
+
+
+class TokenBucketTest(TestCase):
+    def test_take(self) -> None:
+        with patch("evtstrd.ratelimit.time.monotonic", return_value=100.0):
+            bucket = TokenBucket(2, 4)
+            assert_equal(3, bucket.take(3))
+            assert_equal(1, bucket.take(3))
+            assert_equal(0, bucket.take(3))
+            assert_almost_equal(0.5, bucket.delay())
+        with patch("evtstrd.ratelimit.time.monotonic", return_value=101.25):
+            assert_equal(2, bucket.take(3))
+            assert_almost_equal(0.25, bucket.delay())
+        with patch("evtstrd.ratelimit.time.monotonic", return_value=200.0):
+            assert_equal(4, bucket.take(10))
+
+
+class ConflatingQueueTest(TestCase):
+    def test_conflate(self) -> None:
+        queue = ConflatingQueue()
+        queue.append(Event("update", "a1", "a"))
+        queue.append(Event("update", "b1", "b"))
+        queue.append(Event("delete", "a2", "a"))
+        queue.append(Event("update", "a3", "a"))
+        assert_equal(3, len(queue))
+        assert_equal(1, queue.conflated)
+        assert_equal(["a3", "b1", "a2"], [e.data for e in queue])
+        assert_equal("a3", queue.popleft().data)
+        queue.clear()
+        assert_equal(0, len(queue))
@@ -0,0 +1,87 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+from asserts import assert_equal, assert_is_none, assert_raises
+
+from evtstrd.events import Notification
+from evtstrd.replay import ReplayBuffer
+
+
+def _notification(id: str) -> Notification:
+    return Notification("sub", "test", {}, id)
+
+
+def _ids(notifications: list[Notification] | None) -> list[str] | None:
+    if notifications is None:
+        return None
+    return [n.id for n in notifications]
+
+
+class ReplayBufferTest(TestCase):
+    def setUp(self) -> None:
+        self.now = 1000.0
+        patcher = patch("evtstrd.replay.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_invalid_depth(self) -> None:
+        with assert_raises(ValueError):
+            ReplayBuffer(0, 60)
+
+    def test_unknown_id(self) -> None:
+        buffer = ReplayBuffer(5, 60)
+        buffer.append(_notification("a"))
+        assert_is_none(buffer.notifications_after("x"))
+
+    def test_notifications_after(self) -> None:
+        buffer = ReplayBuffer(5, 60)
+        for id in "abcd":
+            buffer.append(_notification(id))
+        assert_equal(["b", "c", "d"], _ids(buffer.notifications_after("a")))
+        assert_equal(["d"], _ids(buffer.notifications_after("c")))
+        assert_equal([], _ids(buffer.notifications_after("d")))
+
+    def test_entries_after__across_buffers(self) -> None:
+        first = ReplayBuffer(5, 60)
+        second = ReplayBuffer(5, 60)
+        first.append(_notification("a"))
+        second.append(_notification("b"))
+        first.append(_notification("c"))
+        second.append(_notification("d"))
+        order = second.order_of("b")
+        assert order is not None
+        assert_equal(["c"], [n.id for _, n in first.entries_after(order)])
+        assert_equal(["d"], [n.id for _, n in second.entries_after(order)])
+
+    def test_depth(self) -> None:
+        buffer = ReplayBuffer(3, 60)
+        for id in "abcdefg":
+            buffer.append(_notification(id))
+        assert_equal(3, len(buffer))
+        assert_is_none(buffer.notifications_after("d"))
+        assert_equal(["f", "g"], _ids(buffer.notifications_after("e")))
+
+    def test_duplicate_id(self) -> None:
+        buffer = ReplayBuffer(3, 60)
+        for id in "abac":
+            buffer.append(_notification(id))
+        assert_equal(["c"], _ids(buffer.notifications_after("a")))
+        buffer.append(_notification("d"))
+        buffer.append(_notification("e"))
+        assert_equal(["d", "e"], _ids(buffer.notifications_after("c")))
+        assert_is_none(buffer.notifications_after("a"))
+
+    def test_max_age(self) -> None:
+        buffer = ReplayBuffer(5, 60)
+        buffer.append(_notification("a"))
+        self.now += 30
+        buffer.append(_notification("b"))
+        buffer.append(_notification("c"))
+        assert_equal(1030.0, buffer.newest_time)
+        self.now += 31
+        assert_is_none(buffer.notifications_after("a"))
+        assert_equal(["c"], _ids(buffer.notifications_after("b")))
+        self.now += 30
+        assert_is_none(buffer.notifications_after("b"))
+        assert_equal(0, len(buffer))
+        assert_is_none(buffer.newest_time)
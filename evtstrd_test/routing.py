@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+from asserts import assert_equal, assert_false, assert_is_none, assert_true
+
+from evtstrd.routing import Router, subsystem_matches
+
+
+class SubsystemMatchesTest(TestCase):
+    def test_exact(self) -> None:
+        assert_true(subsystem_matches("orders.eu", "orders.eu"))
+        assert_false(subsystem_matches("orders.eu", "orders.us"))
+        assert_false(subsystem_matches("orders", "orders.eu"))
+
+    def test_single_wildcard(self) -> None:
+        assert_true(subsystem_matches("orders.*", "orders.eu"))
+        assert_false(subsystem_matches("orders.*", "orders"))
+        assert_false(subsystem_matches("orders.*", "orders.eu.berlin"))
+
+    def test_multi_wildcard(self) -> None:
+        assert_true(subsystem_matches("orders.#", "orders"))
+        assert_true(subsystem_matches("orders.#", "orders.eu.berlin"))
+        assert_true(subsystem_matches("#.berlin", "orders.eu.berlin"))
+        assert_false(subsystem_matches("orders.#", "invoices.eu"))
+
+
+class RouterTest(TestCase):
+    def test_get_and_set(self) -> None:
+        router: Router[int] = Router()
+        router.set("orders", 1)
+        router.set("orders.*", 2)
+        assert_equal(1, router.get("orders"))
+        assert_equal(2, router.get("orders.*"))
+        assert_is_none(router.get("orders.#"))
+        assert_equal(2, len(router))
+
+    def test_match(self) -> None:
+        router: Router[str] = Router()
+        for pattern in [
+            "orders.eu.berlin",
+            "orders.*.berlin",
+            "orders.eu.#",
+            "orders.#",
+            "#",
+            "orders.*",
+            "invoices.#",
+        ]:
+            router.set(pattern, pattern)
+        assert_equal(
+            [
+                "#",
+                "orders.#",
+                "orders.*.berlin",
+                "orders.eu.#",
+                "orders.eu.berlin",
+            ],
+            sorted(router.match("orders.eu.berlin")),
+        )
+        assert_equal(
+            ["#", "orders.#", "orders.*", "orders.eu.#"],
+            sorted(router.match("orders.eu")),
+        )
+
+    def test_match_each_pattern_once(self) -> None:
+        router: Router[str] = Router()
+        router.set("#.#", "x")
+        assert_equal(["x"], router.match("a.b.c"))
+
+    def test_remove(self) -> None:
+        router: Router[int] = Router()
+        router.set("orders.eu.#", 1)
+        router.set("orders.*", 2)
+        router.set("orders", 3)
+        router.remove("orders.eu.#")
+        router.remove("orders")
+        router.remove("unknown.*")
+        assert_equal([("orders.*", 2)], list(router.items()))
+        assert_equal([], router.match("orders.eu.berlin"))
+        router.remove("orders.*")
+        assert_equal({}, router._root.children)
+        assert_equal(0, len(router))
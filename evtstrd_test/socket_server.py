@@ -0,0 +1,122 @@
+import json
+from asyncio import StreamReader, StreamWriter
+from typing import Any, cast
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import Mock
+
+from asserts import assert_equal
+
+from evtstrd.dispatcher import Dispatcher
+from evtstrd.framing import MAGIC, encode_frame
+from evtstrd.socket_server import SocketHandler
+
+
+class SocketHandlerTest(IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.dispatcher = Mock(Dispatcher)
+        self.handler = SocketHandler(self.dispatcher)
+
+    async def _handle(self, *messages: Any) -> None:
+        reader = StreamReader()
+        for message in messages:
+            reader.feed_data(json.dumps(message).encode() + b"\n")
+        reader.feed_eof()
+        await self.handler.handle(reader, cast(StreamWriter, Mock()))
+
+    def _notified(self) -> list[list[tuple[str, str, Any, str]]]:
+        calls = self.dispatcher.notify_all.call_args_list
+        return [
+            [(n.subsystem, n.type, n.data, n.id) for n in c.args[0]]
+            for c in calls
+        ]
+
+    async def test_notify(self) -> None:
+        await self._handle(
+            {
+                "action": "notify",
+                "subsystem": "sub",
+                "event": "add",
+                "data": {"foo": 1},
+                "id": "a",
+            }
+        )
+        assert_equal([[("sub", "add", {"foo": 1}, "a")]], self._notified())
+
+    async def test_notify_batch(self) -> None:
+        await self._handle(
+            {
+                "action": "notify-batch",
+                "events": [
+                    {
+                        "subsystem": "sub",
+                        "event": "add",
+                        "data": {"foo": 1},
+                        "id": "a",
+                    },
+                    {"subsystem": "sub", "event": "invalid"},
+                    {
+                        "subsystem": "other",
+                        "event": "remove",
+                        "data": {},
+                        "id": "b",
+                    },
+                ],
+            }
+        )
+        assert_equal(
+            [
+                [
+                    ("sub", "add", {"foo": 1}, "a"),
+                    ("other", "remove", {}, "b"),
+                ]
+            ],
+            self._notified(),
+        )
+
+    async def test_notify_batch__invalid(self) -> None:
+        await self._handle({"action": "notify-batch", "events": {}})
+        assert_equal([], self._notified())
+
+    async def test_notify_in_one_call(self) -> None:
+        reader = StreamReader()
+        for id in ["a", "b"]:
+            message = {
+                "action": "notify",
+                "subsystem": "sub",
+                "event": "add",
+                "data": {},
+                "id": id,
+            }
+            reader.feed_data(json.dumps(message).encode() + b"\n")
+        reader.feed_data(b"INVALID\n")
+        reader.feed_eof()
+        await self.handler.handle(reader, cast(StreamWriter, Mock()))
+        assert_equal(
+            [[("sub", "add", {}, "a"), ("sub", "add", {}, "b")]],
+            self._notified(),
+        )
+
+    async def test_binary_framing(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(MAGIC)
+        reader.feed_data(encode_frame("sub", "add", "a", b'{"foo": 1}'))
+        reader.feed_data(encode_frame("other", "remove", "b", b"{}"))
+        reader.feed_eof()
+        await self.handler.handle(reader, cast(StreamWriter, Mock()))
+        assert_equal(
+            [
+                [
+                    ("sub", "add", {"foo": 1}, "a"),
+                    ("other", "remove", {}, "b"),
+                ]
+            ],
+            self._notified(),
+        )
+
+    async def test_binary_framing__unsupported_version(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(MAGIC[:-1] + b"\xff")
+        reader.feed_data(encode_frame("sub", "add", "a", b"{}"))
+        reader.feed_eof()
+        await self.handler.handle(reader, cast(StreamWriter, Mock()))
+        assert_equal([], self._notified())
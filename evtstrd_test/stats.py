@@ -0,0 +1,127 @@
+import json
+from unittest import TestCase
+
+from asserts import assert_equal
+
+from evtstrd.config import Config
+from evtstrd.filters import parse_filter
+from evtstrd.listener import Listener
+from evtstrd.stats import (
+    ConnectionSummary,
+    JSONConnection,
+    JSONStats,
+    ServerStats,
+    iter_json_stats,
+    json_summary,
+    merge_stats,
+    merge_summaries,
+)
+from evtstrd_test.fakes import fake_streams
+
+
+def _listener(subsystem: str, *filters: str) -> Listener:
+    reader, writer = fake_streams()
+    return Listener(
+        Config(),
+        reader,
+        writer,
+        {subsystem: [parse_filter(f) for f in filters]},
+    )
+
+
+def _stats(start_time: str, *subsystems: str) -> JSONStats:
+    connections: list[JSONConnection] = [
+        {
+            "subsystem": s,
+            "filters": [],
+            "subscriptions": {s: []},
+            "connection-time": start_time,
+            "remote-host": None,
+            "queue-depth": 1,
+            "dropped-events": 2,
+            "bytes-written": 100,
+        }
+        for s in subsystems
+    ]
+    return {
+        "start-time": start_time,
+        "total-connections": 10,
+        "queued-events": len(connections),
+        "dropped-events": 5,
+        "connections": connections,
+    }
+
+
+class MergeStatsTest(TestCase):
+    def test_merge(self) -> None:
+        merged = merge_stats(
+            [
+                _stats("2026-04-13T12:00:00", "a", "b"),
+                _stats("2026-04-13T11:00:00", "c"),
+            ]
+        )
+        assert_equal("2026-04-13T11:00:00", merged["start-time"])
+        assert_equal(20, merged["total-connections"])
+        assert_equal(3, merged["queued-events"])
+        assert_equal(10, merged["dropped-events"])
+        assert_equal(
+            ["a", "b", "c"], [c["subsystem"] for c in merged["connections"]]
+        )
+        assert_equal(2, merged["workers"])
+
+
+class ConnectionSummaryTest(TestCase):
+    def test_add_and_remove(self) -> None:
+        summary = ConnectionSummary()
+        first = _listener("sub", "foo=1", "bar=2")
+        second = _listener("sub", "foo=1")
+        third = _listener("other")
+        summary.add(first)
+        summary.add(second)
+        summary.add(third)
+        summary.remove(first)
+        assert_equal(2, summary.active)
+        assert_equal({"sub": 1, "other": 1}, summary.subsystems)
+        assert_equal({"foo=1": 1}, summary.filters)
+        assert_equal({"127.0.0.1": 2}, summary.remote_hosts)
+
+    def test_merge(self) -> None:
+        stats = ServerStats()
+        stats.connections.add(_listener("sub", "foo=1"))
+        summary = json_summary(stats)
+        merged = merge_summaries([summary, summary])
+        assert_equal(2, merged["active-connections"])
+        assert_equal({"sub": 2}, merged["subsystems"])
+        assert_equal({"foo=1": 2}, merged["filters"])
+        assert_equal(2, merged["workers"])
+
+
+class IterJSONStatsTest(TestCase):
+    def test_all_connections(self) -> None:
+        stats = ServerStats()
+        stats.dropped_events = 3
+        listeners = [_listener(str(i)) for i in range(5)]
+        pieces = list(iter_json_stats(stats, listeners, batch_size=2))
+        j = json.loads("".join(pieces))
+        assert_equal(
+            ["0", "1", "2", "3", "4"],
+            [c["subsystem"] for c in j["connections"]],
+        )
+        assert_equal(3, j["dropped-events"])
+        assert_equal(0, j["queued-events"])
+
+    def test_page(self) -> None:
+        listeners = [_listener(str(i)) for i in range(5)]
+        pieces = iter_json_stats(
+            ServerStats(), listeners, offset=1, limit=3, batch_size=2
+        )
+        j = json.loads("".join(pieces))
+        assert_equal(
+            ["1", "2", "3"], [c["subsystem"] for c in j["connections"]]
+        )
+
+    def test_page_beyond_end(self) -> None:
+        listeners = [_listener("sub")]
+        pieces = iter_json_stats(ServerStats(), listeners, offset=5)
+        j = json.loads("".join(pieces))
+        assert_equal([], j["connections"])
@@ -0,0 +1,48 @@
+from asyncio import StreamReader
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal, assert_raises
+
+from evtstrd.exc import DisconnectedError
+from evtstrd.util import JSONLineReader
+
+
+class JSONLineReaderTest(IsolatedAsyncioTestCase):
+    async def test_read_all_lines(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(b'{"a": 1}\n\n[2]\r\n3\n')
+        lines = JSONLineReader(reader)
+        assert_equal([{"a": 1}, [2], 3], await lines.read())
+
+    async def test_partial_lines(self) -> None:
+        reader = StreamReader()
+        lines = JSONLineReader(reader, read_size=4)
+        reader.feed_data(b'{"a": 1}\n{"b"')
+        reader.feed_data(b": 2}\n")
+        assert_equal([{"a": 1}], await lines.read())
+        assert_equal([{"b": 2}], await lines.read())
+
+    async def test_skip_invalid_json(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(b'1\nINVALID\n\xff\n{"a": 2}\n')
+        lines = JSONLineReader(reader)
+        assert_equal([1, {"a": 2}], await lines.read())
+
+    async def test_eof(self) -> None:
+        reader = StreamReader()
+        reader.feed_data(b"1\n2")
+        reader.feed_eof()
+        lines = JSONLineReader(reader)
+        assert_equal([1], await lines.read())
+        assert_equal([2], await lines.read())
+        with assert_raises(DisconnectedError):
+            await lines.read()
+
+    async def test_discard_overlong_lines(self) -> None:
+        reader = StreamReader()
+        lines = JSONLineReader(reader, read_size=4, max_line_size=8)
+        reader.feed_data(b'"0123456789"\n1\n"0123456789"')
+        reader.feed_eof()
+        assert_equal([1], await lines.read())
+        with assert_raises(DisconnectedError):
+            await lines.read()
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import socket
+from multiprocessing.process import BaseProcess
+from typing import cast
+from unittest import IsolatedAsyncioTestCase
+
+from asserts import assert_equal
+
+from evtstrd.config import Config
+from evtstrd.dispatcher import Dispatcher
+from evtstrd.events import Notification
+from evtstrd.stats import ServerStats
+from evtstrd.workers import WorkerChannel, WorkerProcess, WorkerRelay
+
+
+class WorkerRelayTest(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        master_sock, self.worker_sock = socket.socketpair()
+        self.worker_sock.setblocking(False)
+        worker = WorkerProcess(0, cast(BaseProcess, None), master_sock)
+        self.relay = WorkerRelay([worker])
+        await self.relay.__aenter__()
+
+    async def asyncTearDown(self) -> None:
+        await self.relay.__aexit__(None, None, None)
+        self.worker_sock.close()
+
+    async def test_notify_all(self) -> None:
+        self.relay.notify_all(
+            [
+                Notification("sub", "add", {"foo": 1}, "a"),
+                Notification("other", "remove", {}, "b"),
+            ]
+        )
+        reader, _ = await asyncio.open_unix_connection(sock=self.worker_sock)
+        line = await reader.readline()
+        assert_equal(
+            {
+                "action": "notify-batch",
+                "events": [
+                    {
+                        "subsystem": "sub",
+                        "event": "add",
+                        "data": {"foo": 1},
+                        "id": "a",
+                    },
+                    {
+                        "subsystem": "other",
+                        "event": "remove",
+                        "data": {},
+                        "id": "b",
+                    },
+                ],
+            },
+            json.loads(line),
+        )
+
+    async def test_collect_stats(self) -> None:
+        stats = ServerStats()
+        stats.total_connections = 3
+        dispatcher = Dispatcher(Config(), stats)
+        reader, writer = await asyncio.open_unix_connection(
+            sock=self.worker_sock
+        )
+        channel = WorkerChannel(dispatcher, stats, writer)
+        task = asyncio.create_task(channel.handle(reader, writer))
+        try:
+            merged = await channel.collect_stats()
+        finally:
+            task.cancel()
+        assert_equal(1, merged["workers"])
+        assert_equal(3, merged["total-connections"])
+
+    async def test_collect_metrics(self) -> None:
+        stats = ServerStats()
+        stats.events_delivered.inc(4)
+        dispatcher = Dispatcher(Config(), stats)
+        reader, writer = await asyncio.open_unix_connection(
+            sock=self.worker_sock
+        )
+        channel = WorkerChannel(dispatcher, stats, writer)
+        task = asyncio.create_task(channel.handle(reader, writer))
+        try:
+            merged = await channel.collect_metrics()
+        finally:
+            task.cancel()
+        samples = merged["eventstreamd_events_delivered_total"]["samples"]
+        assert_equal({"eventstreamd_events_delivered_total": 4}, samples)